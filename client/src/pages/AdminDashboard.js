@@ -9,6 +9,11 @@ const AdminDashboard = () => {
   const [services, setServices] = useState([]);
   const [availabilities, setAvailabilities] = useState([]);
   const [appointments, setAppointments] = useState([]);
+  const [days, setDays] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [pageWindow, setPageWindow] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [dateWindow, setDateWindow] = useState({ dateFrom: '', dateTo: '' });
   const [loading, setLoading] = useState(true);
   const [newService, setNewService] = useState({ id: '', name: '', requirements: [] });
   const [newAvailability, setNewAvailability] = useState({ date: '', time: '', slots: 10 });
@@ -16,37 +21,50 @@ const AdminDashboard = () => {
   const [reqInput, setReqInput] = useState('');
 
   useEffect(() => {
-    fetchServices();
-    fetchAvailabilities();
-    fetchAppointments();
+    fetchDashboard();
   }, []);
 
-  const fetchServices = async () => {
+  const fetchDashboard = async (range = dateWindow) => {
     try {
-      const response = await axios.get('/api/admin/services');
-      setServices(response.data.services);
+      const params = {};
+      if (range.dateFrom) params.dateFrom = range.dateFrom;
+      if (range.dateTo) params.dateTo = range.dateTo;
+      const response = await axios.get('/api/admin/dashboard', { params });
+      setServices(response.data.services || []);
+      setAvailabilities(response.data.availabilities || []);
+      setAppointments(response.data.appointments || []);
+      setNextCursor(response.data.nextCursor || null);
+      setPageWindow(response.data.window);
+      setDays(response.data.days || []);
+      setDateWindow(response.data.window);
     } catch (err) {
-      console.error('Error fetching services:', err);
+      console.error('Error fetching dashboard:', err);
+      alert(err.response?.data?.message || 'Failed to load dashboard');
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchAvailabilities = async () => {
+  const loadMoreAppointments = async () => {
+    setLoadingMore(true);
     try {
-      const response = await axios.get('/api/admin/availability');
-      setAvailabilities(response.data.availabilities || []);
+      const response = await axios.get('/api/admin/appointments', {
+        params: { ...pageWindow, limit: 500, cursor: nextCursor }
+      });
+      setAppointments([...appointments, ...(response.data.appointments || [])]);
+      setNextCursor(response.data.nextCursor || null);
     } catch (err) {
-      console.error('Error fetching availabilities:', err);
+      alert(err.response?.data?.message || 'Failed to load more appointments');
+    } finally {
+      setLoadingMore(false);
     }
   };
 
-  const fetchAppointments = async () => {
-    try {
-      const response = await axios.get('/api/admin/appointments');
-      setAppointments(response.data.appointments || []);
-    } catch (err) {
-      console.error('Error fetching appointments:', err);
+  const handleWindowChange = (field, value) => {
+    const range = { ...dateWindow, [field]: value };
+    setDateWindow(range);
+    if (range.dateFrom && range.dateTo) {
+      fetchDashboard(range);
     }
   };
 
@@ -59,7 +77,7 @@ const AdminDashboard = () => {
     try {
       await axios.post('/api/admin/services', newService);
       setNewService({ id: '', name: '', requirements: [] });
-      fetchServices();
+      fetchDashboard();
     } catch (err) {
       alert('Failed to add service');
     }
@@ -69,7 +87,7 @@ const AdminDashboard = () => {
     try {
       await axios.put(`/api/admin/services/${editingService.id}`, editingService);
       setEditingService(null);
-      fetchServices();
+      fetchDashboard();
     } catch (err) {
       alert('Failed to update service');
     }
@@ -79,7 +97,7 @@ const AdminDashboard = () => {
     if (window.confirm('Are you sure you want to delete this service?')) {
       try {
         await axios.delete(`/api/admin/services/${id}`);
-        fetchServices();
+        fetchDashboard();
       } catch (err) {
         alert('Failed to delete service');
       }
@@ -95,7 +113,7 @@ const AdminDashboard = () => {
     try {
       await axios.post('/api/admin/availability', newAvailability);
       setNewAvailability({ date: '', time: '', slots: 10 });
-      fetchAvailabilities();
+      fetchDashboard();
     } catch (err) {
       alert('Failed to add availability');
     }
@@ -105,13 +123,22 @@ const AdminDashboard = () => {
     if (window.confirm('Are you sure you want to delete this availability?')) {
       try {
         await axios.delete(`/api/admin/availability/${id}`);
-        fetchAvailabilities();
+        fetchDashboard();
       } catch (err) {
         alert('Failed to delete availability');
       }
     }
   };
 
+  const handleServeAppointment = async (id) => {
+    try {
+      await axios.post(`/api/admin/appointments/${id}/serve`);
+      fetchDashboard();
+    } catch (err) {
+      alert(err.response?.data?.message || 'Failed to mark appointment as served');
+    }
+  };
+
   const addRequirement = () => {
     if (reqInput.trim()) {
       if (editingService) {
@@ -157,6 +184,17 @@ const AdminDashboard = () => {
           <h1>Admin Dashboard</h1>
         </div>
 
+        <div className="admin-form">
+          <label>
+            From{' '}
+            <input type="date" value={dateWindow.dateFrom} onChange={(e) => handleWindowChange('dateFrom', e.target.value)} />
+          </label>
+          <label>
+            To{' '}
+            <input type="date" value={dateWindow.dateTo} onChange={(e) => handleWindowChange('dateTo', e.target.value)} />
+          </label>
+        </div>
+
         <div className="admin-tabs">
           <button
             className={activeTab === 'services' ? 'tab active' : 'tab'}
@@ -330,6 +368,24 @@ const AdminDashboard = () => {
 
         {activeTab === 'appointments' && (
           <div className="admin-content">
+            <h2>Daily Summary</h2>
+            <div className="availabilities-list">
+              {days.length === 0 ? (
+                <div className="empty-state">No bookings or time slots in this window</div>
+              ) : (
+                days.map((day) => (
+                  <div key={day.date} className="availability-item">
+                    <div className="availability-info">
+                      <strong>{day.date}</strong>
+                      <span>Pending: {day.byStatus.pending || 0}</span>
+                      <span>Queue: {day.queueLength}</span>
+                      <span>Remaining slots: {day.remaining} / {day.slots}</span>
+                    </div>
+                  </div>
+                ))
+              )}
+            </div>
+
             <h2>Appointments (Queue Order by Date)</h2>
             <div className="appointments-list">
               {appointments.length === 0 ? (
@@ -349,11 +405,24 @@ const AdminDashboard = () => {
                         <span>{a.date} {a.time || ''}</span>
                         <span>{a.email}</span>
                         <span>Queue #{a.queueNumber || '-'}</span>
+                        <span>Status: {a.status}</span>
                       </div>
+                      {a.status === 'approved' && (
+                        <div className="appointment-actions">
+                          <button className="save-btn" onClick={() => handleServeAppointment(a.id)}>
+                            Mark Served
+                          </button>
+                        </div>
+                      )}
                     </div>
                   ))
               )}
             </div>
+            {nextCursor && (
+              <button className="add-btn" onClick={loadMoreAppointments} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : `Showing ${appointments.length} appointments - load more`}
+              </button>
+            )}
           </div>
         )}
       </div>
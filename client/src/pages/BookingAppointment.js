@@ -1,8 +1,13 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import './BookingAppointment.css';
 
+const newIdempotencyKey = () =>
+  (window.crypto && window.crypto.randomUUID)
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 const BookingAppointment = () => {
   const navigate = useNavigate();
   const [formData, setFormData] = useState({
@@ -15,6 +20,8 @@ const BookingAppointment = () => {
   const [availableDates, setAvailableDates] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  // Reused for every retry of the same form so the server books it only once.
+  const idempotencyKey = useRef(newIdempotencyKey());
 
   useEffect(() => {
     fetchServices();
@@ -63,6 +70,7 @@ const BookingAppointment = () => {
   };
 
   const handleChange = (e) => {
+    idempotencyKey.current = newIdempotencyKey();
     setFormData({
       ...formData,
       [e.target.name]: e.target.value
@@ -79,7 +87,9 @@ const BookingAppointment = () => {
     setError('');
 
     try {
-      await axios.post('/api/appointments', formData);
+      await axios.post('/api/appointments', formData, {
+        headers: { 'Idempotency-Key': idempotencyKey.current }
+      });
       navigate('/queue');
     } catch (err) {
       setError(err.response?.data?.message || 'Failed to book appointment. Please try again.');
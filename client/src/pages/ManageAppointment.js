@@ -243,14 +243,16 @@ const ManageAppointment = () => {
                       <span className="detail-value">{appointment.queueNumber}</span>
                     </div>
                   )}
-                  <div className="appointment-actions">
-                    <button className="edit-btn" onClick={() => handleEdit(appointment)}>
-                      Edit Appointment
-                    </button>
-                    <button className="cancel-btn" onClick={() => handleCancel(appointment.id)}>
-                      Cancel Appointment
-                    </button>
-                  </div>
+                  {!appointment.archivedAt && (
+                    <div className="appointment-actions">
+                      <button className="edit-btn" onClick={() => handleEdit(appointment)}>
+                        Edit Appointment
+                      </button>
+                      <button className="cancel-btn" onClick={() => handleCancel(appointment.id)}>
+                        Cancel Appointment
+                      </button>
+                    </div>
+                  )}
                 </div>
               </>
             )}
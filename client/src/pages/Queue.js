@@ -1,23 +1,82 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import './Queue.css';
 
+// Position updates are pushed over a WebSocket; polling is only the fallback.
+const POLL_INTERVAL_MS = 30000;
+
+const queueSocketUrl = () => {
+  const base = process.env.REACT_APP_API_URL || window.location.origin;
+  return `${base.replace(/^http/, 'ws')}/api/queue/ws`;
+};
+
 const Queue = () => {
   const navigate = useNavigate();
   const [queueNumber, setQueueNumber] = useState(null);
   const [appointment, setAppointment] = useState(null);
+  const [eta, setEta] = useState(null);
   const [loading, setLoading] = useState(true);
+  const appointmentId = useRef(null);
 
   useEffect(() => {
-    fetchQueue();
+    let socket = null;
+    let pollTimer = null;
+    let stopped = false;
+
+    const startPolling = () => {
+      if (stopped || pollTimer) return;
+      fetchQueue();
+      pollTimer = setInterval(fetchQueue, POLL_INTERVAL_MS);
+    };
+
+    const token = localStorage.getItem('token');
+    if (token && typeof WebSocket !== 'undefined') {
+      socket = new WebSocket(queueSocketUrl());
+      // The token goes in the first message, not the URL, so it stays out of server logs.
+      socket.onopen = () => socket.send(JSON.stringify({ type: 'auth', token }));
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'snapshot') {
+          applyQueue(message);
+        } else if (message.type === 'queue') {
+          // Updates for another of the user's appointments may change which one is current.
+          if (message.appointment && message.appointment.id === appointmentId.current) {
+            applyQueue(message);
+          } else {
+            fetchQueue();
+          }
+        }
+      };
+      socket.onclose = startPolling;
+    } else {
+      startPolling();
+    }
+
+    return () => {
+      stopped = true;
+      clearInterval(pollTimer);
+      if (socket) {
+        socket.onclose = null;
+        socket.close();
+      }
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  const applyQueue = (data) => {
+    const active = data.appointment && ['pending', 'approved'].includes(data.appointment.status) ? data.appointment : null;
+    appointmentId.current = active ? active.id : null;
+    setQueueNumber(active ? data.queueNumber ?? null : null);
+    setAppointment(active);
+    setEta(active ? data.eta ?? null : null);
+    setLoading(false);
+  };
+
   const fetchQueue = async () => {
     try {
       const response = await axios.get('/api/queue/current');
-      setQueueNumber(response.data.queueNumber ?? null);
-      setAppointment(response.data.appointment ?? null);
+      applyQueue(response.data);
     } catch (err) {
       console.error('Error fetching queue:', err);
     } finally {
@@ -76,6 +135,15 @@ const Queue = () => {
                     })}
                   </span>
                 </div>
+                {appointment.estimatedTime && (
+                  <div className="info-row">
+                    <span className="info-label">Estimated Time:</span>
+                    <span className="info-value">
+                      {appointment.estimatedTime}
+                      {eta && eta.waitMinutes > 0 && ` (about ${eta.waitMinutes} min)`}
+                    </span>
+                  </div>
+                )}
               </div>
             )}
 
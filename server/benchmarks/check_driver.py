@@ -0,0 +1,192 @@
+import asyncio
+import os
+import sys
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ["STARTUP_BOOTSTRAP"] = "off"
+
+from fastapi import HTTPException  # noqa: E402
+from neo4j.exceptions import ServiceUnavailable  # noqa: E402
+
+import fake_neo4j  # noqa: E402
+import main  # noqa: E402
+
+HOST = "example.databases.neo4j.io"
+
+
+class ConnectFactory:
+    # Stands in for AsyncGraphDatabase: drivers for unreachable schemes fail
+    # verify_connectivity the way a refused TLS handshake does.
+    def __init__(self, reachable: Iterable[str]) -> None:
+        self.reachable = set(reachable)
+        self.attempts: List[str] = []
+
+    def driver(self, uri: str, auth: Any = None, **options: Any) -> fake_neo4j.FakeDriver:
+        self.attempts.append(uri)
+        driver = fake_neo4j.FakeDriver()
+        reachable = uri.split("://")[0] in self.reachable
+
+        async def verify_connectivity() -> None:
+            if not reachable:
+                raise ServiceUnavailable(f"cannot reach {uri}")
+
+        driver.verify_connectivity = verify_connectivity  # type: ignore[assignment]
+        return driver
+
+
+class FlakySession(fake_neo4j.FakeSession):
+    async def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs: Any) -> fake_neo4j.FakeResult:
+        self.driver.calls += 1  # type: ignore[attr-defined]
+        if self.driver.failures > 0:  # type: ignore[attr-defined]
+            self.driver.failures -= 1  # type: ignore[attr-defined]
+            raise ServiceUnavailable("connection dropped")
+        return await super().run(query, parameters, **kwargs)
+
+
+class FlakyDriver(fake_neo4j.FakeDriver):
+    def __init__(self, failures: int) -> None:
+        super().__init__()
+        self.failures = failures
+        self.calls = 0
+
+    def session(self, **kwargs: Any) -> FlakySession:
+        return FlakySession(self)
+
+
+def reset(reachable: Iterable[str], cached: Optional[str] = None) -> ConnectFactory:
+    factory = ConnectFactory(reachable)
+    main.AsyncGraphDatabase = factory
+    main._driver = None
+    main._driver_failed_at = None
+    main._driver_error = None
+    if cached is None:
+        if os.path.exists(main.NEO4J_URI_CACHE):
+            os.remove(main.NEO4J_URI_CACHE)
+    else:
+        with open(main.NEO4J_URI_CACHE, "w", encoding="utf-8") as f:
+            f.write(cached)
+    return factory
+
+
+def cached_uri() -> Optional[str]:
+    try:
+        with open(main.NEO4J_URI_CACHE, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+async def expect_503() -> HTTPException:
+    try:
+        await main._get_driver()
+    except HTTPException as e:
+        assert e.status_code == 503, e.status_code
+        return e
+    raise AssertionError("expected a 503")
+
+
+async def check_preferred_scheme_is_cached() -> None:
+    factory = reset({"neo4j+s", "neo4j+ssc", "bolt+s", "bolt+ssc"})
+    await main._get_driver()
+    assert cached_uri() == f"neo4j+s://{HOST}", cached_uri()
+    assert factory.attempts == [f"neo4j+s://{HOST}", f"bolt+s://{HOST}"], factory.attempts
+
+
+async def check_cached_uri_skips_probing() -> None:
+    factory = reset({"bolt+s"}, cached=f"bolt+s://{HOST}")
+    await main._get_driver()
+    assert factory.attempts == [f"bolt+s://{HOST}"], factory.attempts
+
+
+async def check_stale_cached_uri_falls_back() -> None:
+    factory = reset({"neo4j+s"}, cached=f"bolt+s://{HOST}")
+    await main._get_driver()
+    assert factory.attempts[0] == f"bolt+s://{HOST}", factory.attempts
+    assert len(factory.attempts) == 3, factory.attempts
+    assert cached_uri() == f"neo4j+s://{HOST}", cached_uri()
+
+
+async def check_unverified_scheme_is_not_cached() -> None:
+    factory = reset({"neo4j+ssc", "bolt+ssc"}, cached=f"bolt+ssc://{HOST}")
+    await main._get_driver()
+    assert factory.attempts[:2] == [f"neo4j+s://{HOST}", f"bolt+s://{HOST}"], factory.attempts
+    assert len(factory.attempts) == 4, factory.attempts
+    assert cached_uri() is None, cached_uri()
+
+    factory = reset({"neo4j+s", "neo4j+ssc", "bolt+ssc"})
+    await main._get_driver()
+    assert not any("+ssc" in uri for uri in factory.attempts), factory.attempts
+    assert cached_uri() == f"neo4j+s://{HOST}", cached_uri()
+
+
+async def check_cooldown_answers_503() -> None:
+    factory = reset(())
+    error = await expect_503()
+    assert error.headers and error.headers.get("Retry-After"), error.headers
+    assert len(factory.attempts) == 4 * main.NEO4J_CONNECT_ATTEMPTS, factory.attempts
+
+    await expect_503()
+    assert len(factory.attempts) == 4 * main.NEO4J_CONNECT_ATTEMPTS, "cooldown must not reconnect"
+
+    factory.reachable.add("neo4j+s")
+    main._driver_failed_at -= main.NEO4J_CONNECT_COOLDOWN
+    await main._get_driver()
+    assert main._driver is not None and main._driver_failed_at is None
+
+
+async def run_flaky(query: str, failures: int, params: Dict[str, Any]) -> Tuple[int, Optional[BaseException]]:
+    driver = FlakyDriver(failures)
+    try:
+        async with main._InstrumentedDriver(driver).session() as session:
+            await session.run(query, params)
+    except ServiceUnavailable as e:
+        return driver.calls, e
+    return driver.calls, None
+
+
+async def check_read_retry_count() -> None:
+    read = "MATCH (u:User {email: $email}) RETURN u"
+    retries = main._InstrumentedSession.retries
+    calls, error = await run_flaky(read, retries, {"email": "nobody@example.com"})
+    assert error is None and calls == retries + 1, (calls, error)
+    calls, error = await run_flaky(read, retries + 1, {"email": "nobody@example.com"})
+    assert error is not None and calls == retries + 1, (calls, error)
+
+
+async def check_writes_are_not_retried() -> None:
+    write = "CREATE (s:Service {id: $id, name: $name})"
+    calls, error = await run_flaky(write, 1, {"id": "x", "name": "x"})
+    assert error is not None and calls == 1, (calls, error)
+
+
+CHECKS: List[Callable[[], Awaitable[None]]] = [
+    check_preferred_scheme_is_cached,
+    check_cached_uri_skips_probing,
+    check_stale_cached_uri_falls_back,
+    check_unverified_scheme_is_not_cached,
+    check_cooldown_answers_503,
+    check_read_retry_count,
+    check_writes_are_not_retried,
+]
+
+
+async def main_async() -> int:
+    os.environ.update(NEO4J_URI=f"neo4j+s://{HOST}", NEO4J_USER="neo4j", NEO4J_PASSWORD="secret")
+    main.NEO4J_URI_CACHE = os.path.join(tempfile.mkdtemp(prefix="neo4j-uri-"), ".neo4j_uri")
+    main._backoff = lambda attempt, base=0.0, cap=0.0: 0.0
+    failed = 0
+    for check in CHECKS:
+        try:
+            await check()
+            print(f"ok    {check.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {check.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main_async()))
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import os
+import sys
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["STARTUP_BOOTSTRAP"] = "off"
+
+import main  # noqa: E402
+
+# The hot lookups, as main.py sends them. Params are built from one stored user and
+# one of their appointments so run.py can time the same statements on the stand-in.
+LOOKUPS: List[Tuple[str, str, Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]]] = [
+    ("user_by_email", "MATCH (u:User {email: $email}) RETURN u", lambda u, a: {"email": u["email"]}),
+    ("user_by_id", "MATCH (u:User {id: $id}) RETURN u", lambda u, a: {"id": u["id"]}),
+    (
+        "appointment_by_id",
+        "MATCH (a:Appointment {id: $id}) RETURN a.status AS status, a.date AS date, a.time AS time, a.queueNumber AS queueNumber",
+        lambda u, a: {"id": a["id"]},
+    ),
+    ("appointments_by_ids", "MATCH (a:Appointment) WHERE a.id IN $ids RETURN a", lambda u, a: {"ids": [a["id"]]}),
+    (
+        "my_appointment",
+        "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a {id: $id}) WHERE a:Appointment OR a:ArchivedAppointment RETURN a",
+        lambda u, a: {"userId": u["id"], "id": a["id"]},
+    ),
+    (
+        "approved_on_date",
+        "MATCH (a:Appointment) WHERE a.status = 'approved' AND a.date = $date "
+        "RETURN a.id AS id, a.service AS service, a.time AS time ORDER BY a.queueNumber",
+        lambda u, a: {"date": a["date"]},
+    ),
+]
+
+_SCANS = ("AllNodesScan", "NodeByLabelScan")
+
+
+def _operators(plan: Any) -> Set[str]:
+    # Plan operators are reported as e.g. "NodeUniqueIndexSeek@neo4j".
+    names = {plan["operatorType"].split("@")[0]}
+    for child in plan.get("children", []):
+        names |= _operators(child)
+    return names
+
+
+def _db_hits(plan: Any) -> int:
+    return plan.get("dbHits", 0) + sum(_db_hits(child) for child in plan.get("children", []))
+
+
+async def check(profile: bool) -> int:
+    driver = await main._get_driver()
+    failed = 0
+    try:
+        async with driver.session() as session:
+            sample = await session.run(
+                "MATCH (u:User)-[:HAS_APPOINTMENT]->(a:Appointment) RETURN u {.id, .email} AS u, a {.id, .date} AS a LIMIT 1"
+            )
+            record = await sample.single()
+            user, appointment = (record["u"], record["a"]) if record else ({"id": "", "email": ""}, {"id": "", "date": ""})
+            for name, query, params in LOOKUPS:
+                result = await session.run(("PROFILE " if profile else "EXPLAIN ") + query, params(user, appointment))
+                summary = await result.consume()
+                plan = summary.profile if profile else summary.plan
+                operators = _operators(plan)
+                scans = sorted(operators & set(_SCANS))
+                seeks = sorted(op for op in operators if "IndexSeek" in op)
+                detail = ", ".join(seeks) or "no index seek"
+                if profile:
+                    detail += f", {_db_hits(plan)} db hits"
+                if scans or not seeks:
+                    failed += 1
+                    print(f"FAIL  {name}: {detail}; scans {', '.join(scans) or 'none'}")
+                else:
+                    print(f"ok    {name}: {detail}")
+    finally:
+        await driver.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the hot lookups are planned as index seeks on the configured Neo4j")
+    parser.add_argument("--profile", action="store_true", help="run the lookups with PROFILE and report db hits (reads only)")
+    sys.exit(asyncio.run(check(parser.parse_args().profile)))
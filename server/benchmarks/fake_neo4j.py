@@ -0,0 +1,636 @@
+import asyncio
+import contextvars
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from neo4j.exceptions import ConstraintError
+from neo4j.time import DateTime
+
+round_trips: "contextvars.ContextVar[Optional[List[int]]]" = contextvars.ContextVar("round_trips", default=None)
+
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _instant(value: Any) -> Any:
+    # neo4j.time comparisons are pure Python and dominate large sorts; native
+    # datetimes order the same way at a fraction of the cost.
+    return value.to_native() if isinstance(value, DateTime) else value
+
+
+class FakeGraph:
+    def __init__(self) -> None:
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.users_by_email: Dict[str, str] = {}
+        self.appointments: Dict[str, Dict[str, Any]] = {}
+        self.archived: Dict[str, Dict[str, Any]] = {}
+        self.owners: Dict[str, str] = {}
+        self.availability: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.services: Dict[str, Dict[str, Any]] = {}
+        self.queue_days: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self._clock = 0
+
+    def now(self) -> DateTime:
+        # Temporal properties come back from a real server as neo4j.time values, not
+        # Python datetimes, so the fake stores them the same way.
+        self._clock += 1
+        return DateTime.from_native(_EPOCH + timedelta(microseconds=self._clock))
+
+    def add_user(self, name: str, email: str, password: str, role: str = "client") -> Dict[str, Any]:
+        user = {"id": str(uuid4()), "name": name, "email": email, "password": password, "role": role, "createdAt": self.now()}
+        self.users[user["id"]] = user
+        self.users_by_email[email] = user["id"]
+        return user
+
+    def add_appointment(self, user_id: str, service: str, appt_date: str, appt_time: str, status: str = "pending") -> Dict[str, Any]:
+        user = self.users[user_id]
+        appointment = {
+            "id": str(uuid4()),
+            "name": user["name"],
+            "email": user["email"],
+            "service": service,
+            "date": appt_date,
+            "time": appt_time,
+            "status": status,
+            "createdAt": self.now(),
+        }
+        self.appointments[appointment["id"]] = appointment
+        self.owners[appointment["id"]] = user_id
+        return appointment
+
+    def add_availability(self, appt_date: str, appt_time: str, slots: int, booked: int = 0) -> Dict[str, Any]:
+        availability = {"id": str(uuid4()), "date": appt_date, "time": appt_time, "slots": slots, "booked": booked}
+        self.availability[(appt_date, appt_time)] = availability
+        return availability
+
+    def add_service(self, name: str, requirements: Iterable[str] = ()) -> Dict[str, Any]:
+        service = {"id": str(uuid4()), "name": name, "requirements": list(requirements)}
+        self.services[service["id"]] = service
+        return service
+
+    def renumber(self, appt_date: str) -> None:
+        queue = sorted(
+            (a for a in self.appointments.values() if a["status"] == "approved" and a["date"] == appt_date),
+            key=lambda a: (a["time"], _instant(a["createdAt"])),
+        )
+        for idx, appointment in enumerate(queue):
+            appointment["queueNumber"] = idx + 1
+
+
+class _Tx:
+    def __init__(self, driver: "FakeDriver") -> None:
+        self.driver = driver
+        self.undo: List[Callable[[], None]] = []
+        self.locks: Dict[Tuple[Any, ...], asyncio.Lock] = {}
+
+    def set(self, node: Dict[str, Any], key: str, value: Any) -> None:
+        missing = key not in node
+        old = node.get(key)
+        self.undo.append(lambda: node.pop(key, None) if missing else node.__setitem__(key, old))
+        node[key] = value
+
+    def remove(self, node: Dict[str, Any], key: str) -> None:
+        if key in node:
+            old = node[key]
+            self.undo.append(lambda: node.__setitem__(key, old))
+            del node[key]
+
+    async def lock(self, keys: Iterable[Tuple[Any, ...]]) -> None:
+        for key in keys:
+            if key in self.locks:
+                continue
+            lock = self.driver.locks.setdefault(key, asyncio.Lock())
+            await asyncio.wait_for(lock.acquire(), self.driver.lock_timeout)
+            self.locks[key] = lock
+
+    def release(self) -> None:
+        for lock in self.locks.values():
+            lock.release()
+        self.locks.clear()
+
+    def rollback(self) -> None:
+        for undo in reversed(self.undo):
+            undo()
+        self.undo.clear()
+
+
+class FakeResult:
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self._rows = rows
+        self._index = 0
+
+    def __aiter__(self) -> "FakeResult":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._index >= len(self._rows):
+            raise StopAsyncIteration
+        self._index += 1
+        return self._rows[self._index - 1]
+
+    async def single(self) -> Optional[Dict[str, Any]]:
+        return self._rows[0] if self._rows else None
+
+    async def peek(self) -> Optional[Dict[str, Any]]:
+        return self._rows[self._index] if self._index < len(self._rows) else None
+
+    async def data(self) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self._rows[self._index:]]
+
+    async def consume(self) -> None:
+        self._index = len(self._rows)
+
+
+class FakeTransaction:
+    def __init__(self, session: "FakeSession", tx: _Tx) -> None:
+        self._session = session
+        self._tx = tx
+
+    async def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs: Any) -> FakeResult:
+        return await self._session._execute(self._tx, query, {**(parameters or {}), **kwargs})
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeDriver") -> None:
+        self.driver = driver
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    async def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs: Any) -> FakeResult:
+        tx = _Tx(self.driver)
+        try:
+            return await self._execute(tx, query, {**(parameters or {}), **kwargs})
+        except BaseException:
+            tx.rollback()
+            raise
+        finally:
+            tx.release()
+
+    async def execute_write(self, work: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        tx = _Tx(self.driver)
+        try:
+            value = await work(FakeTransaction(self, tx), *args, **kwargs)
+            await self.driver.round_trip()
+            return value
+        except BaseException:
+            tx.rollback()
+            raise
+        finally:
+            tx.release()
+
+    execute_read = execute_write
+
+    async def _execute(self, tx: _Tx, query: str, params: Dict[str, Any]) -> FakeResult:
+        query = " ".join(query.split())
+        for pattern, locks, apply in self.driver.handlers:
+            match = pattern.match(query)
+            if match is None:
+                continue
+            await self.driver.round_trip(half=True)
+            if locks is not None:
+                await tx.lock(locks(self.driver.graph, params))
+            rows = apply(self.driver.graph, tx, params, query)
+            await self.driver.round_trip(half=True, count=False)
+            return FakeResult(rows)
+        raise NotImplementedError(f"fake_neo4j has no handler for query: {query}")
+
+
+class FakeDriver:
+    def __init__(self, graph: Optional[FakeGraph] = None, latency: float = 0.0, lock_timeout: float = 10.0) -> None:
+        self.graph = graph or FakeGraph()
+        self.latency = latency
+        self.lock_timeout = lock_timeout
+        self.locks: Dict[Tuple[Any, ...], asyncio.Lock] = {}
+        self.handlers = _HANDLERS
+        self.total_round_trips = 0
+
+    def session(self, **kwargs: Any) -> FakeSession:
+        return FakeSession(self)
+
+    async def round_trip(self, half: bool = False, count: bool = True) -> None:
+        if count:
+            self.total_round_trips += 1
+            counter = round_trips.get()
+            if counter is not None:
+                counter[0] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency / 2 if half else self.latency)
+
+    async def verify_connectivity(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+_HANDLERS: List[Tuple["re.Pattern[str]", Optional[Callable[..., List[Tuple[Any, ...]]]], Callable[..., List[Dict[str, Any]]]]] = []
+
+
+def _handles(pattern: str, locks: Optional[Callable[..., List[Tuple[Any, ...]]]] = None):
+    def register(apply: Callable[..., List[Dict[str, Any]]]) -> Callable[..., List[Dict[str, Any]]]:
+        _HANDLERS.append((re.compile(pattern), locks, apply))
+        return apply
+
+    return register
+
+
+def _slot_keys(graph: FakeGraph, p: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    return [("Availability", p["date"], p["time"])]
+
+
+def _slot_list_keys(graph: FakeGraph, p: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    return [("Availability", s["date"], s["time"]) for s in p["slots"]]
+
+
+def _appointment_keys(graph: FakeGraph, p: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    return [("Appointment", i) for i in p.get("ids") or [p["id"]]]
+
+
+def _approved_on_date(graph: FakeGraph, appt_date: str) -> List[Dict[str, Any]]:
+    return [a for a in graph.appointments.values() if a["status"] == "approved" and a["date"] == appt_date]
+
+
+def _state(appointment: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: appointment.get(k) for k in ("status", "date", "time", "queueNumber")}
+
+
+@_handles(r"^RETURN 1$")
+def _ping(graph, tx, p, q):
+    return [{"1": 1}]
+
+
+@_handles(r"^OPTIONAL MATCH \(s:Service\) WITH count\(s\) AS services OPTIONAL MATCH \(u:User \{email: \$email, role: 'admin'\}\) RETURN services, count\(u\) AS admins$")
+def _bootstrap_status(graph, tx, p, q):
+    admins = [u for u in graph.users.values() if u["email"] == p["email"] and u["role"] == "admin"]
+    return [{"services": len(graph.services), "admins": len(admins)}]
+
+
+@_handles(r"^MATCH \(r:RevokedToken\) WHERE r.expiresAt IS NULL OR r.expiresAt > \$now RETURN r.jti AS jti, r.expiresAt AS expiresAt$")
+def _revoked_tokens(graph, tx, p, q):
+    return []
+
+
+@_handles(r"^MATCH \(u:User \{email: \$email\}\) RETURN u$")
+def _user_by_email(graph, tx, p, q):
+    user_id = graph.users_by_email.get(p["email"])
+    return [{"u": dict(graph.users[user_id])}] if user_id else []
+
+
+@_handles(r"^MATCH \(u:User \{id: \$id\}\) RETURN u$")
+def _user_by_id(graph, tx, p, q):
+    user = graph.users.get(p["id"])
+    return [{"u": dict(user)}] if user else []
+
+
+@_handles(r"^CREATE \(u:User \{id: randomUUID\(\), name: \$name, email: \$email, password: \$password, role: 'client'")
+def _create_user(graph, tx, p, q):
+    if p["email"] in graph.users_by_email:
+        raise ConstraintError("User.email already exists")
+    user = graph.add_user(p["name"], p["email"], p["password"])
+    tx.undo.append(lambda: (graph.users.pop(user["id"]), graph.users_by_email.pop(user["email"])))
+    return [{"u": dict(user)}]
+
+
+@_handles(r"^MATCH \(s:Service\) RETURN s \{\.\*\} AS s ORDER BY s.name$")
+def _services(graph, tx, p, q):
+    return [{"s": dict(s)} for s in sorted(graph.services.values(), key=lambda s: s["name"])]
+
+
+@_handles(r"^MATCH \(a:Availability\) (WHERE .* )?RETURN a \{\.\*\} AS a ORDER BY a.date, a.time$")
+def _availability(graph, tx, p, q):
+    rows = []
+    for key in sorted(graph.availability):
+        a = graph.availability[key]
+        if "a.date >= $dateFrom" in q and a["date"] < p["dateFrom"]:
+            continue
+        if "a.date <= $dateTo" in q and a["date"] > p["dateTo"]:
+            continue
+        if "coalesce(a.booked, 0) < a.slots" in q and (a.get("booked") or 0) >= a["slots"]:
+            continue
+        rows.append({"a": dict(a)})
+    return rows
+
+
+@_handles(r"^MATCH \(av:Availability \{date: \$date, time: \$time\}\) SET av.booked = coalesce\(av.booked, 0\) \+ 1", _slot_keys)
+def _reserve_slot(graph, tx, p, q):
+    slot = graph.availability.get((p["date"], p["time"]))
+    if slot is None:
+        return []
+    tx.set(slot, "booked", (slot.get("booked") or 0) + 1)
+    return [{"booked": slot["booked"], "slots": slot["slots"]}]
+
+
+@_handles(r"^MATCH \(av:Availability \{date: \$date, time: \$time\}\) SET av.booked = CASE", _slot_keys)
+def _release_slot(graph, tx, p, q):
+    slot = graph.availability.get((p["date"], p["time"]))
+    if slot is not None:
+        tx.set(slot, "booked", max(0, (slot.get("booked") or 0) - 1))
+    return []
+
+
+@_handles(r"^UNWIND \$slots AS s MATCH \(av:Availability \{date: s.date, time: s.time\}\) SET av.booked = coalesce", _slot_list_keys)
+def _reserve_slots(graph, tx, p, q):
+    rows = []
+    for s in p["slots"]:
+        slot = graph.availability.get((s["date"], s["time"]))
+        if slot is not None:
+            tx.set(slot, "booked", (slot.get("booked") or 0) + s["count"])
+            rows.append({"date": slot["date"], "time": slot["time"], "booked": slot["booked"], "slots": slot["slots"]})
+    return rows
+
+
+@_handles(r"^UNWIND \$slots AS s MATCH \(av:Availability \{date: s.date, time: s.time\}\) SET av.booked = CASE", _slot_list_keys)
+def _release_slots(graph, tx, p, q):
+    for s in p["slots"]:
+        slot = graph.availability.get((s["date"], s["time"]))
+        if slot is not None:
+            tx.set(slot, "booked", max(0, (slot.get("booked") or 0) - s["count"]))
+    return []
+
+
+@_handles(r"^MATCH \(u:User \{id: \$userId\}\) SET u._bookingLock = true REMOVE u._bookingLock WITH u OPTIONAL MATCH", lambda g, p: [("User", p["userId"])])
+def _lock_active_booking(graph, tx, p, q):
+    user = graph.users.get(p["userId"])
+    if user is None:
+        return []
+    for i, a in graph.appointments.items():
+        if (
+            graph.owners.get(i) == p["userId"]
+            and a["service"] == p["service"]
+            and a["date"] == p["date"]
+            and a["status"] in p["statuses"]
+            and i != p["excludeId"]
+        ):
+            return [{"a": dict(a)}]
+    return [{"a": None}]
+
+
+@_handles(r"^MATCH \(u:User \{id: \$userId\}\) CREATE \(a:Appointment ")
+def _create_appointment(graph, tx, p, q):
+    if p["userId"] not in graph.users:
+        return []
+    appointment = graph.add_appointment(p["userId"], p["service"], p["date"], p["time"])
+    appointment.update(name=p["name"], email=p["email"])
+    tx.undo.append(lambda: (graph.appointments.pop(appointment["id"]), graph.owners.pop(appointment["id"])))
+    return [{"a": dict(appointment)}]
+
+
+@_handles(
+    r"^MATCH \(u:User \{id: \$userId\}\)-\[:HAS_APPOINTMENT\]->\(a:Appointment\) WHERE a.status IN \['pending','approved'\] "
+    r"RETURN a ORDER BY a.createdAt DESC LIMIT 1$"
+)
+def _current_queue(graph, tx, p, q):
+    active = [
+        a for i, a in graph.appointments.items() if graph.owners.get(i) == p["userId"] and a["status"] in ("pending", "approved")
+    ]
+    active.sort(key=lambda a: _instant(a["createdAt"]), reverse=True)
+    return [{"a": dict(active[0])}] if active else []
+
+
+@_handles(
+    r"^MATCH \(u:User\)-\[:HAS_APPOINTMENT\]->\(a:Appointment\) WHERE u.id IN \$userIds "
+    r"AND \(a.id = \$id OR \(a.status = 'approved' AND a.date IN \$dates\)\) RETURN u.id AS userId, a$"
+)
+def _queue_subscribers(graph, tx, p, q):
+    users = set(p["userIds"])
+    return [
+        {"userId": graph.owners[i], "a": dict(a)}
+        for i, a in graph.appointments.items()
+        if graph.owners.get(i) in users and (i == p["id"] or (a["status"] == "approved" and a["date"] in p["dates"]))
+    ]
+
+
+@_handles(r"^(MATCH \(u:User \{id: \$userId\}\)-\[:HAS_APPOINTMENT\]->\(a:Appointment \{id: \$id\}\)|MATCH \(a:Appointment \{id: \$id\}\)) RETURN a.status AS status")
+def _queue_state(graph, tx, p, q):
+    appointment = graph.appointments.get(p["id"])
+    if appointment is None or (q.startswith("MATCH (u:User") and graph.owners.get(p["id"]) != p.get("userId")):
+        return []
+    return [_state(appointment)]
+
+
+@_handles(r"^MATCH \(a:Appointment\) WHERE a.id IN \$ids RETURN a.id AS id, a.status AS status")
+def _bulk_states(graph, tx, p, q):
+    return [{"id": i, **_state(graph.appointments[i])} for i in p["ids"] if i in graph.appointments]
+
+
+@_handles(r"^MERGE \(d:QueueDay \{date: \$date\}\) SET d.lockedAt = datetime\(\)$", lambda g, p: [("QueueDay", p["date"])])
+def _lock_queue_day(graph, tx, p, q):
+    day = graph.queue_days.setdefault(p["date"], {"date": p["date"]})
+    tx.set(day, "lockedAt", graph.now())
+    return []
+
+
+@_handles(r"^MATCH \(a:Appointment \{id: \$id\}\) OPTIONAL MATCH \(o:Appointment\) .* RETURN count\(o\) \+ 1 AS position$")
+def _queue_position(graph, tx, p, q):
+    a = graph.appointments[p["id"]]
+    ahead = [
+        o
+        for o in _approved_on_date(graph, p["date"])
+        if o["id"] != a["id"] and (o["time"] < a["time"] or (o["time"] == a["time"] and _instant(o["createdAt"]) < _instant(a["createdAt"])))
+    ]
+    return [{"position": len(ahead) + 1}]
+
+
+@_handles(r"^OPTIONAL MATCH \(t:Appointment\) WHERE t.status = 'approved' AND t.date = \$date AND t.id <> \$id AND t.queueNumber >= \$position")
+def _queue_shift(graph, tx, p, q):
+    for t in _approved_on_date(graph, p["date"]):
+        if t["id"] != p["id"] and (t.get("queueNumber") or 0) >= p["position"]:
+            tx.set(t, "queueNumber", t["queueNumber"] + 1)
+    tx.set(graph.appointments[p["id"]], "queueNumber", p["position"])
+    return []
+
+
+@_handles(r"^MATCH \(t:Appointment\) WHERE t.status = 'approved' AND t.date = \$date AND t.id <> \$id AND t.queueNumber > \$queueNumber")
+def _queue_close_gap(graph, tx, p, q):
+    for t in _approved_on_date(graph, p["date"]):
+        if t["id"] != p["id"] and (t.get("queueNumber") or 0) > p["queueNumber"]:
+            tx.set(t, "queueNumber", t["queueNumber"] - 1)
+    return []
+
+
+@_handles(r"^MATCH \(a:Appointment\) WHERE a.status = 'approved' AND a.date = \$date WITH a ORDER BY")
+def _renumber(graph, tx, p, q):
+    queue = sorted(_approved_on_date(graph, p["date"]), key=lambda a: (a["time"], _instant(a["createdAt"])))
+    for idx, appointment in enumerate(queue):
+        tx.set(appointment, "queueNumber", idx + 1)
+    return []
+
+
+@_handles(r"^MATCH \(a:Appointment\) WHERE a.status = 'approved' AND a.date = \$date RETURN a.id AS id, a.queueNumber AS queueNumber ORDER BY a.time ASC, a.createdAt ASC$")
+def _queue_check(graph, tx, p, q):
+    queue = sorted(_approved_on_date(graph, p["date"]), key=lambda a: (a["time"], _instant(a["createdAt"])))
+    return [{"id": a["id"], "queueNumber": a.get("queueNumber")} for a in queue]
+
+
+def _decide(graph, tx, ids: List[str], decision: str, p: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for i in ids:
+        appointment = graph.appointments.get(i)
+        if appointment is None:
+            continue
+        tx.set(appointment, "status", decision)
+        tx.set(appointment, decision + "At", graph.now())
+        if decision == "approved":
+            tx.set(appointment, "estimatedTime", p.get("estimatedTime"))
+        else:
+            tx.remove(appointment, "queueNumber")
+        rows.append({"a": dict(appointment)})
+    return rows
+
+
+@_handles(r"^MATCH \(a:Appointment \{id: \$id\}\) SET a.status = '(approved|declined)'", _appointment_keys)
+def _decide_one(graph, tx, p, q):
+    return _decide(graph, tx, [p["id"]], "approved" if "'approved'" in q else "declined", p)
+
+
+@_handles(r"^MATCH \(a:Appointment \{id: \$id\}\) SET a.status = 'cancelled', a.cancelledAt = datetime\(\)$", _appointment_keys)
+def _cancel(graph, tx, p, q):
+    appointment = graph.appointments[p["id"]]
+    tx.set(appointment, "status", "cancelled")
+    tx.set(appointment, "cancelledAt", graph.now())
+    return []
+
+
+@_handles(r"^MATCH \(a:Appointment\) WHERE a.id IN \$ids SET a.status = '(approved|declined)'", _appointment_keys)
+def _decide_many(graph, tx, p, q):
+    return _decide(graph, tx, p["ids"], "approved" if "'approved'" in q else "declined", p)
+
+
+@_handles(r"^MATCH \(a:Appointment \{id: \$id\}\) OPTIONAL MATCH \(p:Appointment \{date: a.date, status: 'served'\}\) RETURN")
+def _serve_context(graph, tx, p, q):
+    appointment = graph.appointments[p["id"]]
+    served = [a["servedAt"] for a in graph.appointments.values() if a["status"] == "served" and a["date"] == appointment["date"]]
+    return [{"service": appointment["service"], "approvedAt": appointment.get("approvedAt"), "previous": max(served, default=None)}]
+
+
+@_handles(r"^MATCH \(a:Appointment \{id: \$id\}\) SET a.status = 'served'", _appointment_keys)
+def _serve(graph, tx, p, q):
+    appointment = graph.appointments[p["id"]]
+    tx.set(appointment, "status", "served")
+    tx.set(appointment, "servedAt", DateTime.from_native(p["servedAt"]))
+    tx.set(appointment, "serviceSeconds", p["seconds"])
+    tx.remove(appointment, "queueNumber")
+    return [{"a": dict(appointment)}]
+
+
+@_handles(r"^MERGE \(t:ServiceTiming \{service: \$service\}\) SET t.samples", lambda g, p: [("ServiceTiming", p["service"])])
+def _record_timing(graph, tx, p, q):
+    timing = graph.timings.setdefault(p["service"], {"service": p["service"]})
+    tx.set(timing, "samples", (timing.get("samples", []) + [p["seconds"]])[-p["window"] :])
+    return []
+
+
+@_handles(r"^MATCH \(t:ServiceTiming\) RETURN t.service AS service, t.samples AS samples$")
+def _timings(graph, tx, p, q):
+    return [{"service": t["service"], "samples": t.get("samples")} for t in graph.timings.values()]
+
+
+@_handles(r"^MATCH \(a:Appointment\) WHERE a.status = 'approved' AND a.date = \$date RETURN a.id AS id, a.service AS service, a.time AS time ORDER BY a.queueNumber$")
+def _eta_queue(graph, tx, p, q):
+    queue = sorted(_approved_on_date(graph, p["date"]), key=lambda a: a.get("queueNumber") or 0)
+    return [{"id": a["id"], "service": a["service"], "time": a["time"]} for a in queue]
+
+
+@_handles(r"^MATCH \(a:Appointment\) WHERE a.id IN \$ids RETURN a$")
+def _appointments_by_id(graph, tx, p, q):
+    return [{"a": dict(graph.appointments[i])} for i in p["ids"] if i in graph.appointments]
+
+
+_FILTERS = {
+    "a.status IN $statuses": lambda a, p: a["status"] in p["statuses"],
+    "a.date >= $dateFrom": lambda a, p: a["date"] >= p["dateFrom"],
+    "a.date <= $dateTo": lambda a, p: a["date"] <= p["dateTo"],
+    "a.service = $service": lambda a, p: a["service"] == p["service"],
+}
+
+
+def _sort_value(appointment: Dict[str, Any], expr: str) -> Any:
+    if expr.startswith("toString(") and expr.endswith(")"):
+        value = _sort_value(appointment, expr[len("toString(") : -1])
+        return value.iso_format() if value is not None else None
+    return appointment.get(expr[len("a.") :])
+
+
+_PAGE_QUERY = r"^MATCH \(a:(?P<label>Appointment|ArchivedAppointment)\) (WHERE (?P<where>.*?) )?WITH a ORDER BY (?P<order>.*?)( LIMIT \$limit)? RETURN a \{\.\*\} AS a, (?P<returns>.*)$"
+
+
+@_handles(_PAGE_QUERY)
+def _appointment_page(graph, tx, p, q):
+    match = re.match(_PAGE_QUERY, q)
+    clauses = match.group("where").split(" AND ") if match.group("where") else []
+    unsupported = [c for c in clauses if c not in _FILTERS]
+    if unsupported:
+        raise NotImplementedError(f"fake_neo4j cannot evaluate {unsupported} (cursors are not supported)")
+    order = [part[: -len(" ASC")] for part in match.group("order").split(", ")]
+    returns = [part.split(" AS ") for part in match.group("returns").split(", ")]
+    source = graph.archived if match.group("label") == "ArchivedAppointment" else graph.appointments
+    rows = [a for a in source.values() if all(_FILTERS[c](a, p) for c in clauses)]
+    keys = [expr[len("toString(") : -1] if expr.startswith("toString(") else expr for expr in order]
+    rows.sort(key=lambda a: tuple(_instant(_sort_value(a, expr)) for expr in keys))
+    if "limit" in p:
+        rows = rows[: p["limit"]]
+    return [{"a": dict(a), **{alias: _sort_value(a, expr) for expr, alias in returns}} for a in rows]
+
+
+def _owned(graph: FakeGraph, user_id: str) -> List[Dict[str, Any]]:
+    return [a for i, a in {**graph.appointments, **graph.archived}.items() if graph.owners.get(i) == user_id]
+
+
+@_handles(r"^MATCH \(u:User \{id: \$userId\}\)-\[:HAS_APPOINTMENT\]->\(a\) WHERE a:Appointment OR a:ArchivedAppointment RETURN a \{\.\*\} AS a ORDER BY a.createdAt DESC$")
+def _my_appointments(graph, tx, p, q):
+    return [{"a": dict(a)} for a in sorted(_owned(graph, p["userId"]), key=lambda a: _instant(a["createdAt"]), reverse=True)]
+
+
+@_handles(r"^MATCH \(u:User \{id: \$userId\}\)-\[:HAS_APPOINTMENT\]->\(a \{id: \$id\}\) WHERE a:Appointment OR a:ArchivedAppointment RETURN a$")
+def _my_appointment(graph, tx, p, q):
+    return [{"a": dict(a)} for a in _owned(graph, p["userId"]) if a["id"] == p["id"]]
+
+
+def _archive_candidates(graph: FakeGraph, p: Dict[str, Any]) -> List[str]:
+    return [i for i, a in graph.appointments.items() if a["date"] < p["cutoff"] and a["status"] in p["statuses"]][: p["limit"]]
+
+
+@_handles(
+    r"^MATCH \(a:Appointment\) WHERE a.date < \$cutoff AND a.status IN \$statuses WITH a LIMIT \$limit REMOVE a:Appointment SET a:ArchivedAppointment",
+    lambda g, p: [("Appointment", i) for i in _archive_candidates(g, p)],
+)
+def _archive(graph, tx, p, q):
+    moved = _archive_candidates(graph, p)
+    now = graph.now()
+    for i in moved:
+        appointment = graph.appointments.pop(i)
+        appointment["archivedAt"] = now
+        graph.archived[i] = appointment
+        tx.undo.append(lambda i=i: graph.appointments.__setitem__(i, graph.archived.pop(i)))
+    return [{"archived": len(moved), "dates": sorted({graph.archived[i]["date"] for i in moved})}]
+
+
+@_handles(r"^MATCH \(a:Appointment\) WHERE a.date >= \$dateFrom AND a.date <= \$dateTo RETURN a.date AS date, a.status AS status, count\(\*\) AS count$")
+def _status_counts(graph, tx, p, q):
+    counts: Dict[Tuple[str, str], int] = {}
+    for a in graph.appointments.values():
+        if p["dateFrom"] <= a["date"] <= p["dateTo"]:
+            counts[(a["date"], a["status"])] = counts.get((a["date"], a["status"]), 0) + 1
+    return [{"date": d, "status": s, "count": c} for (d, s), c in counts.items()]
+
+
+@_handles(r"^MATCH \(av:Availability\) WHERE av.date >= \$dateFrom AND av.date <= \$dateTo WITH av.date AS date, av.slots AS slots")
+def _slot_totals(graph, tx, p, q):
+    totals: Dict[str, Dict[str, Any]] = {}
+    for av in graph.availability.values():
+        if p["dateFrom"] <= av["date"] <= p["dateTo"]:
+            row = totals.setdefault(av["date"], {"date": av["date"], "slots": 0, "booked": 0, "remaining": 0})
+            booked = av.get("booked") or 0
+            row["slots"] += av["slots"]
+            row["booked"] += booked
+            row["remaining"] += max(0, av["slots"] - booked)
+    return list(totals.values())
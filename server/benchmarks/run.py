@@ -0,0 +1,767 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ["STARTUP_BOOTSTRAP"] = "off"
+os.environ.setdefault("EVENT_BUS", "local")
+
+import check_indexes  # noqa: E402
+import fake_neo4j  # noqa: E402
+import main  # noqa: E402
+
+BENCH_DATE = "2030-01-15"
+BENCH_TIMES = ["08:00", "09:00", "10:00"]
+BENCH_PASSWORD = "benchmark-pass"
+
+
+@dataclass
+class Sample:
+    status: int
+    seconds: float
+    round_trips: int
+    items: int = 1
+    started: float = 0.0
+
+
+async def call(
+    method: str,
+    path: str,
+    token: Optional[str] = None,
+    body: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+    client: str = "127.0.0.1",
+) -> Tuple[int, Dict[str, str], bytes, int]:
+    path, _, query = path.partition("?")
+    raw_headers = [(b"host", b"benchmark")]
+    payload = b""
+    if body is not None:
+        payload = json.dumps(body).encode("utf-8")
+        raw_headers.append((b"content-type", b"application/json"))
+        raw_headers.append((b"content-length", str(len(payload)).encode("ascii")))
+    if token:
+        raw_headers.append((b"authorization", b"Bearer " + token.encode("ascii")))
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("utf-8"),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": (client, 50000),
+        "server": ("benchmark", 80),
+    }
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if sent:
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    response: Dict[str, Any] = {"status": 0, "headers": {}, "body": []}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode("latin-1"): v.decode("latin-1") for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    counter = [0]
+    reset = fake_neo4j.round_trips.set(counter)
+    try:
+        await main.app(scope, receive, send)
+    finally:
+        fake_neo4j.round_trips.reset(reset)
+    return response["status"], response["headers"], b"".join(response["body"]), counter[0]
+
+
+class Socket:
+    # A WebSocket client driven straight through the ASGI app, like call() for HTTP.
+    def __init__(self) -> None:
+        self.incoming: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self.outgoing: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.close_code: Optional[int] = None
+        self.task: Optional["asyncio.Future[None]"] = None
+
+    async def connect(self, path: str) -> None:
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"benchmark")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+            "subprotocols": [],
+        }
+        self.outgoing.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.ensure_future(main.app(scope, self.outgoing.get, self._send))
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "websocket.send":
+            self.incoming.put_nowait(json.loads(message["text"]))
+        elif message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            self.incoming.put_nowait(None)
+
+    def send(self, data: Any) -> None:
+        self.outgoing.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive(self, kind: str, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        # Skips keep-alive pings; None means the server closed the socket.
+        while True:
+            message = await asyncio.wait_for(self.incoming.get(), timeout)
+            if message is None or message.get("type") == kind:
+                return message
+
+    async def close(self) -> None:
+        self.outgoing.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        if self.task is not None:
+            await asyncio.wait_for(self.task, 5.0)
+
+
+async def measure(
+    jobs: Iterable[Callable[[], Awaitable[Tuple[int, Dict[str, str], bytes, int]]]],
+    concurrency: int,
+    items: int = 1,
+) -> List[Sample]:
+    gate = asyncio.Semaphore(concurrency)
+    samples: List[Sample] = []
+
+    async def one(job: Callable[[], Awaitable[Tuple[int, Dict[str, str], bytes, int]]]) -> None:
+        async with gate:
+            started = perf_counter()
+            status_code, _, _, trips = await job()
+            samples.append(Sample(status_code, perf_counter() - started, trips, items, started))
+
+    await asyncio.gather(*(one(job) for job in jobs))
+    return samples
+
+
+def fresh_driver(latency: float, graph: Optional[fake_neo4j.FakeGraph] = None) -> fake_neo4j.FakeDriver:
+    driver = fake_neo4j.FakeDriver(graph, latency=latency)
+    main._driver = main._InstrumentedDriver(driver)
+    for cache in (main._catalog_cache, main._availability_cache, main._profile_cache, main._timing_cache, main._eta_cache, main._queue_cache, main._idempotency_cache):
+        cache.invalidate()
+    main._token_cache.clear()
+    main._rate_limit_store = main._LocalBucketStore(main.RATE_LIMIT_MAX_KEYS)
+    return driver
+
+
+def expect(args: argparse.Namespace, ok: bool, message: str) -> None:
+    # Invariant checks fail the run (exit status 1) without stopping the remaining scenarios.
+    if not ok:
+        args.failures.append(message)
+
+
+def client_ip(i: int) -> str:
+    return f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+
+
+def seed_users(graph: fake_neo4j.FakeGraph, count: int, password_hash: str) -> List[Tuple[Dict[str, Any], str]]:
+    users = []
+    for i in range(count):
+        user = graph.add_user(f"Bench User {i}", f"bench{i}@example.com", password_hash)
+        users.append((user, main._create_token(user["id"], user["email"], "client")))
+    return users
+
+
+def admin_token(graph: fake_neo4j.FakeGraph, password_hash: str) -> str:
+    admin = graph.add_user("Bench Admin", "bench-admin@example.com", password_hash, role="admin")
+    return main._create_token(admin["id"], admin["email"], "admin")
+
+
+async def scenario_auth(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    fresh_driver(args.db_latency)
+    n = 20 * args.scale
+    signups = await measure(
+        (
+            lambda i=i: call(
+                "POST",
+                "/api/auth/signup",
+                body={"name": f"User {i}", "email": f"user{i}@example.com", "password": BENCH_PASSWORD},
+                client=client_ip(i),
+            )
+            for i in range(n)
+        ),
+        args.concurrency,
+    )
+    logins = await measure(
+        (
+            lambda i=i: call(
+                "POST", "/api/auth/login", body={"email": f"user{i}@example.com", "password": BENCH_PASSWORD}, client=client_ip(i)
+            )
+            for i in range(n)
+        ),
+        args.concurrency,
+    )
+    return {"signup_burst": signups, "login_burst": logins}
+
+
+async def scenario_booking(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    for t in BENCH_TIMES:
+        graph.add_availability(BENCH_DATE, t, slots=10 * args.scale)
+    users = seed_users(graph, 100 * args.scale, args.password_hash)
+    accepted: Set[str] = set()
+
+    async def book(token: str, body: Dict[str, Any], ip: str) -> Tuple[int, Dict[str, str], bytes, int]:
+        status_code, headers, raw, trips = await call("POST", "/api/appointments", token=token, body=body, client=ip)
+        if status_code == 200:
+            accepted.add(json.loads(raw)["appointment"]["id"])
+        return status_code, headers, raw, trips
+
+    jobs = []
+    # Every user double-submits, each time for a random slot, so the rush races both
+    # for seats and against the one-active-booking rule. A resubmission for the slot
+    # already held answers 200 with the same appointment.
+    for i, (user, token) in enumerate(users * 2):
+        body = {
+            "name": user["name"],
+            "email": user["email"],
+            "service": "Birth Certificate",
+            "date": BENCH_DATE,
+            "time": rng.choice(BENCH_TIMES),
+        }
+        jobs.append(lambda token=token, body=body, ip=client_ip(i): book(token, body, ip))
+    rng.shuffle(jobs)
+    samples = await measure(jobs, args.concurrency)
+
+    seats = sum(a["slots"] for a in graph.availability.values())
+    overbooked = [f"{a['date']} {a['time']}" for a in graph.availability.values() if (a.get("booked") or 0) > a["slots"]]
+    expect(args, not overbooked, f"booking_rush: slots booked past capacity: {', '.join(overbooked)}")
+    expect(
+        args,
+        len(accepted) == len(graph.appointments) == min(seats, len(users)),
+        f"booking_rush: {len(accepted)} bookings answered 200 and {len(graph.appointments)} stored for {seats} seats and {len(users)} users",
+    )
+    active: Dict[str, int] = {}
+    for i, a in graph.appointments.items():
+        if a["status"] in main._ACTIVE_STATUSES:
+            active[graph.owners[i]] = active.get(graph.owners[i], 0) + 1
+    doubled = sum(1 for n in active.values() if n > 1)
+    expect(args, not doubled, f"booking_rush: {doubled} users hold more than one active booking")
+    return {"booking_rush": samples}
+
+
+async def scenario_throttle(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    graph.add_availability(BENCH_DATE, BENCH_TIMES[0], slots=1000)
+    (user, token), = seed_users(graph, 1, args.password_hash)
+    body = {"name": user["name"], "email": user["email"], "service": "Birth Certificate", "date": BENCH_DATE, "time": BENCH_TIMES[0]}
+    n = 200 * args.scale
+    login = await measure(
+        (lambda: call("POST", "/api/auth/login", body={"email": user["email"], "password": "wrong-password"}) for _ in range(n)),
+        args.concurrency,
+    )
+    booking = await measure((lambda: call("POST", "/api/appointments", token=token, body=body) for _ in range(n)), args.concurrency)
+    return {"login_flood_one_ip": login, "booking_flood_one_user": booking}
+
+
+async def scenario_polling(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    for t in BENCH_TIMES:
+        graph.add_availability(BENCH_DATE, t, slots=50)
+    users = seed_users(graph, 50 * args.scale, args.password_hash)
+    for user, _ in users:
+        graph.add_appointment(user["id"], "Birth Certificate", BENCH_DATE, rng.choice(BENCH_TIMES), status="approved")
+    graph.renumber(BENCH_DATE)
+    rounds = 10
+
+    plain = await measure(
+        (lambda token=token: call("GET", "/api/queue/current", token=token) for _ in range(rounds) for _, token in users),
+        args.concurrency,
+    )
+
+    etags: Dict[str, str] = {}
+    for _, token in users:
+        _, headers, _, _ = await call("GET", "/api/queue/current", token=token)
+        etags[token] = headers.get("etag", "")
+    conditional = await measure(
+        (
+            lambda token=token: call("GET", "/api/queue/current", token=token, headers={"If-None-Match": etags[token]})
+            for _ in range(rounds)
+            for _, token in users
+        ),
+        args.concurrency,
+    )
+    availability = await measure(
+        (lambda: call("GET", "/api/availability") for _ in range(rounds * len(users))),
+        args.concurrency,
+    )
+    # Tags are derived from the data, so one handed out before the caches were dropped
+    # (as by another worker, or before a restart) must still match afterwards.
+    _, token = users[0]
+    for path in ("/api/queue/current", "/api/availability", "/api/services"):
+        _, headers, _, _ = await call("GET", path, token=token)
+        fresh_driver(args.db_latency, graph)
+        status_code, _, _, _ = await call("GET", path, token=token, headers={"If-None-Match": headers.get("etag", "")})
+        expect(args, status_code == 304, f"polling: {path} answered {status_code} to its own ETag after a cache reset")
+    return {"queue_poll": plain, "queue_poll_etag": conditional, "availability_poll": availability}
+
+
+async def scenario_scaling(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    # The same read mix at rising concurrency on one worker: with a non-blocking data
+    # layer req/s should climb until the simulated database latency is hidden.
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    graph.add_service("Birth Certificate", ["PSA copy"])
+    for t in BENCH_TIMES:
+        graph.add_availability(BENCH_DATE, t, slots=100)
+    users = seed_users(graph, 64, args.password_hash)
+    for user, _ in users:
+        graph.add_appointment(user["id"], "Birth Certificate", BENCH_DATE, rng.choice(BENCH_TIMES), status="approved")
+    graph.renumber(BENCH_DATE)
+    paths = ["/api/queue/current", "/api/appointments/my-appointments", "/api/services", "/api/availability"]
+    results: Dict[str, List[Sample]] = {}
+    for concurrency in (1, 8, 32, 64):
+        jobs = []
+        for i in range(640 * args.scale):
+            _, token = users[i % len(users)]
+            jobs.append(lambda token=token, path=paths[i % len(paths)], ip=client_ip(i): call("GET", path, token=token, client=ip))
+        results[f"mix_c{concurrency}"] = await measure(jobs, concurrency)
+    return results
+
+
+async def scenario_push(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    # Every client of a date listens on /api/queue/ws while the admin serves the head of
+    # the queue; each sample is the time from the serve request to that client's update.
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    users = seed_users(graph, 50 * args.scale, args.password_hash)
+    for user, _ in users:
+        graph.add_appointment(user["id"], "Birth Certificate", BENCH_DATE, rng.choice(BENCH_TIMES), status="approved")
+    graph.renumber(BENCH_DATE)
+    token = admin_token(graph, args.password_hash)
+
+    rejected = Socket()
+    await rejected.connect("/api/queue/ws")
+    rejected.send({"type": "auth", "token": "not-a-token"})
+    expect(args, await rejected.receive("snapshot") is None and rejected.close_code == 1008, "push: a bad token was not refused with 1008")
+
+    sockets = []
+    for user, user_token in users:
+        socket = Socket()
+        await socket.connect("/api/queue/ws")
+        socket.send({"type": "auth", "token": user_token})
+        snapshot = await socket.receive("snapshot")
+        expect(args, snapshot is not None, f"push: no snapshot for {user['email']}")
+        sockets.append((user, socket))
+
+    serves: List[Sample] = []
+    pushes: List[Sample] = []
+    for _ in range(5):
+        head = min((a for a in graph.appointments.values() if a["status"] == "approved"), key=lambda a: a["queueNumber"])
+        started = perf_counter()
+        status_code, _, _, trips = await call("POST", f"/api/admin/appointments/{head['id']}/serve", token=token)
+        serves.append(Sample(status_code, perf_counter() - started, trips, 1, started))
+
+        async def update(user: Dict[str, Any], socket: Socket) -> None:
+            try:
+                message = await socket.receive("queue")
+                pushes.append(Sample(200 if message is not None else 500, perf_counter() - started, 0, 1, started))
+            except asyncio.TimeoutError:
+                pushes.append(Sample(504, perf_counter() - started, 0, 1, started))
+                return
+            mine = next((a for i, a in graph.appointments.items() if graph.owners[i] == user["id"]), None)
+            if message is not None and mine is not None and mine["status"] == "approved":
+                expect(args, message["queueNumber"] == mine["queueNumber"], f"push: {user['email']} was sent a stale queue number")
+
+        # Only clients still queued, and the one just served, are told about the change.
+        waiting = [(u, s) for u, s in sockets if any(graph.owners[i] == u["id"] and (a["status"] == "approved" or i == head["id"]) for i, a in graph.appointments.items())]
+        await asyncio.gather(*(update(u, s) for u, s in waiting))
+
+    for _, socket in sockets:
+        await socket.close()
+    return {"push_serve": serves, "push_update": pushes}
+
+
+def seed_pending(args: argparse.Namespace, rng: random.Random) -> Tuple[fake_neo4j.FakeGraph, str, List[str]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    dates = [BENCH_DATE, "2030-01-16"]
+    for d in dates:
+        for t in BENCH_TIMES:
+            graph.add_availability(d, t, slots=100 * args.scale)
+    users = seed_users(graph, 100 * args.scale, args.password_hash)
+    ids = []
+    for user, _ in users:
+        d, t = rng.choice(dates), rng.choice(BENCH_TIMES)
+        graph.availability[(d, t)]["booked"] += 1
+        ids.append(graph.add_appointment(user["id"], "Birth Certificate", d, t)["id"])
+    return graph, admin_token(graph, args.password_hash), ids
+
+
+async def scenario_approve(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    _, token, ids = seed_pending(args, rng)
+    each = await measure(
+        (lambda i=i: call("POST", f"/api/admin/appointments/{i}/approve", token=token, body={}) for i in ids),
+        args.concurrency,
+    )
+
+    _, token, ids = seed_pending(args, rng)
+    batch = 25
+    batches = [ids[i : i + batch] for i in range(0, len(ids), batch)]
+    bulk: List[Sample] = []
+    for chunk in batches:
+        bulk += await measure(
+            [lambda chunk=chunk: call("POST", "/api/admin/appointments/bulk-approve", token=token, body={"ids": chunk})],
+            1,
+            items=len(chunk),
+        )
+    return {"approve_each": each, "approve_bulk": bulk}
+
+
+async def scenario_renumber(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    # Approving into a day and rebuilding a day's queue should cost the same number of
+    # round trips however many people are already queued; only latency may grow.
+    results: Dict[str, List[Sample]] = {}
+    for size in (10, 100, 1000):
+        size *= args.scale
+        driver = fresh_driver(args.db_latency)
+        graph = driver.graph
+        for t in BENCH_TIMES:
+            graph.add_availability(BENCH_DATE, t, slots=2 * size)
+        users = seed_users(graph, 50, args.password_hash)
+        for i in range(size):
+            user, _ = users[i % len(users)]
+            graph.add_appointment(user["id"], "Birth Certificate", BENCH_DATE, rng.choice(BENCH_TIMES), status="approved")
+        graph.renumber(BENCH_DATE)
+        pending = [
+            graph.add_appointment(users[i % len(users)][0]["id"], "Birth Certificate", BENCH_DATE, rng.choice(BENCH_TIMES))["id"]
+            for i in range(20)
+        ]
+        token = admin_token(graph, args.password_hash)
+        results[f"approve_day{size}"] = await measure(
+            [lambda i=i: call("POST", f"/api/admin/appointments/{i}/approve", token=token, body={}) for i in pending], 1
+        )
+        results[f"rebuild_day{size}"] = await measure(
+            (lambda: call("POST", f"/api/admin/queue/rebuild?date={BENCH_DATE}", token=token) for _ in range(10)), 1, items=size
+        )
+    return results
+
+
+async def scenario_serving(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    users = seed_users(graph, 50 * args.scale, args.password_hash)
+    for user, _ in users:
+        graph.add_appointment(user["id"], rng.choice(["Birth Certificate", "Death Registration"]), BENCH_DATE, rng.choice(BENCH_TIMES), status="approved")
+    graph.renumber(BENCH_DATE)
+    token = admin_token(graph, args.password_hash)
+    queue = sorted(graph.appointments.values(), key=lambda a: a.get("queueNumber") or 0)
+    ids = [a["id"] for a in queue if a["status"] == "approved"]
+    polls: List[Sample] = []
+    served: List[Sample] = []
+    for i in ids[: len(ids) // 2]:
+        served += await measure([lambda i=i: call("POST", f"/api/admin/appointments/{i}/serve", token=token)], 1)
+        polls += await measure((lambda token=token: call("GET", "/api/queue/current", token=token) for _, token in users[:10]), args.concurrency)
+    return {"serve": served, "queue_poll_eta": polls}
+
+
+async def scenario_listing(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    users = seed_users(graph, 100, args.password_hash)
+    for i in range(10000 * args.scale):
+        user, _ = users[i % len(users)]
+        graph.add_appointment(user["id"], "Birth Certificate", f"2030-01-{1 + i % 28:02d}", rng.choice(BENCH_TIMES), status="approved")
+    token = admin_token(graph, args.password_hash)
+    full = await measure((lambda: call("GET", "/api/admin/appointments?stream=array", token=token) for _ in range(10)), 1)
+    paged = await measure((lambda: call("GET", "/api/admin/appointments?limit=500", token=token) for _ in range(50)), 1)
+    return {"admin_list_10k": full, "admin_list_page500": paged}
+
+
+async def scenario_dashboard(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    for name in ("Birth Certificate", "Marriage Certificate", "Death Registration"):
+        graph.add_service(name, ["National ID"])
+    users = seed_users(graph, 100, args.password_hash)
+    days = [f"2030-{1 + d // 28:02d}-{1 + d % 28:02d}" for d in range(90)]
+    for d in days:
+        for t in BENCH_TIMES:
+            graph.add_availability(d, t, slots=50)
+    for i in range(5000 * args.scale):
+        user, _ = users[i % len(users)]
+        graph.add_appointment(user["id"], "Birth Certificate", days[i % len(days)], rng.choice(BENCH_TIMES), status=rng.choice(["pending", "approved", "declined"]))
+    token = admin_token(graph, args.password_hash)
+
+    async def separate() -> Tuple[int, Dict[str, str], bytes, int]:
+        responses = await asyncio.gather(
+            call("GET", "/api/admin/services", token=token),
+            call("GET", "/api/admin/availability", token=token),
+            call("GET", "/api/admin/appointments", token=token),
+        )
+        return responses[0][0], {}, b"", sum(r[3] for r in responses)
+
+    rounds = 20
+    three = await measure((separate for _ in range(rounds)), 1)
+    combined = await measure(
+        (lambda: call("GET", f"/api/admin/dashboard?dateFrom={days[0]}&dateTo={days[13]}", token=token) for _ in range(rounds)), 1
+    )
+    return {"dashboard_three_fetches": three, "dashboard_combined_14d": combined}
+
+
+async def scenario_archive(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    driver = fresh_driver(args.db_latency)
+    graph = driver.graph
+    users = seed_users(graph, 100, args.password_hash)
+    for i in range(10000 * args.scale):
+        user, _ = users[i % len(users)]
+        status = rng.choice(["approved", "declined", "cancelled", "served"])
+        graph.add_appointment(user["id"], "Birth Certificate", f"2020-{1 + i % 12:02d}-{1 + i % 28:02d}", rng.choice(BENCH_TIMES), status=status)
+    for i in range(1000 * args.scale):
+        user, _ = users[i % len(users)]
+        graph.add_appointment(user["id"], "Birth Certificate", BENCH_DATE, rng.choice(BENCH_TIMES), status="approved")
+    token = admin_token(graph, args.password_hash)
+    rounds = 10
+    before = await measure((lambda: call("GET", "/api/admin/appointments", token=token) for _ in range(rounds)), 1)
+    archive = await measure([lambda: call("POST", "/api/admin/archive/run", token=token)], 1)
+    archive[0].items = len(graph.archived)
+    after = await measure((lambda: call("GET", "/api/admin/appointments", token=token) for _ in range(rounds)), 1)
+    archived = await measure((lambda: call("GET", "/api/admin/archive/appointments?limit=500", token=token) for _ in range(rounds)), 1)
+    # Archived nodes carry an archivedAt timestamp, so the client history views must
+    # still serialize them.
+    user, user_token = users[0]
+    archived_id = next(i for i in graph.archived if graph.owners[i] == user["id"])
+    history = await measure((lambda: call("GET", "/api/appointments/my-appointments", token=user_token) for _ in range(rounds)), 1)
+    history += await measure((lambda: call("GET", f"/api/appointments/{archived_id}", token=user_token) for _ in range(rounds)), 1)
+    return {
+        "admin_list_with_history": before,
+        "archive_run": archive,
+        "admin_list_archived": after,
+        "archive_page500": archived,
+        "user_history_archived": history,
+    }
+
+
+async def query(statement: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes, int]:
+    counter = [0]
+    reset = fake_neo4j.round_trips.set(counter)
+    try:
+        async with main._driver.session() as session:
+            result = await session.run(statement, params)
+            await result.data()
+    finally:
+        fake_neo4j.round_trips.reset(reset)
+    return 200, {}, b"", counter[0]
+
+
+async def scenario_lookups(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    # Times the hot lookups from check_indexes.py as history grows. The stand-in keys
+    # users and appointments by id and email but scans for everything else, so it
+    # cannot show what the Neo4j indexes buy; check_indexes.py verifies the plans on a
+    # real database.
+    results: Dict[str, List[Sample]] = {}
+    for size in (1000, 10000, 100000):
+        driver = fresh_driver(args.db_latency)
+        graph = driver.graph
+        users = seed_users(graph, 1000, args.password_hash)
+        for i in range(size * args.scale):
+            user, _ = users[i % len(users)]
+            graph.add_appointment(user["id"], "Birth Certificate", f"2029-{1 + i % 12:02d}-{1 + i % 28:02d}", rng.choice(BENCH_TIMES), status=rng.choice(["approved", "served", "cancelled"]))
+        for i in range(20):
+            user, _ = users[i]
+            graph.add_appointment(user["id"], "Birth Certificate", BENCH_DATE, BENCH_TIMES[i % len(BENCH_TIMES)], status="approved")
+        user, _ = users[0]
+        appointment = next(a for i, a in graph.appointments.items() if graph.owners[i] == user["id"] and a["date"] == BENCH_DATE)
+        label = f"{size // 1000}k"
+        for name, statement, params in check_indexes.LOOKUPS:
+            jobs = (lambda: query(statement, params(user, appointment)) for _ in range(100))
+            results[f"{name}_{label}"] = await measure(jobs, 1)
+    return results
+
+
+async def scenario_startup(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    # Times the real startup hook (pool warm-up, bootstrap check, revoked-token load)
+    # against the stand-in; a run that prints a warning is reported as status 500.
+    results: Dict[str, List[Sample]] = {}
+    for mode in ("off", "verify"):
+        samples: List[Sample] = []
+        for _ in range(20):
+            driver = fresh_driver(args.db_latency)
+            driver.graph.add_service("Birth Certificate", ["PSA copy"])
+            driver.graph.add_user("Admin", main.ADMIN_EMAIL, args.password_hash, role="admin")
+            main.STARTUP_BOOTSTRAP = mode
+            output = io.StringIO()
+            counter = [0]
+            reset = fake_neo4j.round_trips.set(counter)
+            started = perf_counter()
+            try:
+                with contextlib.redirect_stdout(output):
+                    await main.startup_event()
+            finally:
+                fake_neo4j.round_trips.reset(reset)
+            elapsed = perf_counter() - started
+            status = 500 if "warning" in output.getvalue().lower() else 200
+            samples.append(Sample(status, elapsed, counter[0], 1, started))
+            await main.shutdown_event()
+        results[f"startup_{mode}"] = samples
+    main.STARTUP_BOOTSTRAP = "off"
+    return results
+
+
+async def scenario_tokens(args: argparse.Namespace, rng: random.Random) -> Dict[str, List[Sample]]:
+    token = main._create_token("benchmark-user", "bench@example.com", "client")
+    n = 2000 * args.scale
+    results: Dict[str, List[Sample]] = {"token_decode": [], "token_verify_cached": []}
+    for name, fn in (("token_decode", main._decode_token), ("token_verify_cached", main._verify_token)):
+        for _ in range(n):
+            started = perf_counter()
+            fn(token)
+            results[name].append(Sample(200, perf_counter() - started, 0, 1, started))
+    return results
+
+
+SCENARIOS: Dict[str, Callable[[argparse.Namespace, random.Random], Awaitable[Dict[str, List[Sample]]]]] = {
+    "auth": scenario_auth,
+    "booking": scenario_booking,
+    "polling": scenario_polling,
+    "scaling": scenario_scaling,
+    "approve": scenario_approve,
+    "renumber": scenario_renumber,
+    "throttle": scenario_throttle,
+    "listing": scenario_listing,
+    "lookups": scenario_lookups,
+    "dashboard": scenario_dashboard,
+    "serving": scenario_serving,
+    "push": scenario_push,
+    "archive": scenario_archive,
+    "startup": scenario_startup,
+    "tokens": scenario_tokens,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[Sample]) -> Dict[str, Any]:
+    seconds = [s.seconds for s in samples]
+    wall = max(s.started + s.seconds for s in samples) - min(s.started for s in samples) if samples else 0.0
+    statuses: Dict[str, int] = {}
+    for s in samples:
+        statuses[str(s.status)] = statuses.get(str(s.status), 0) + 1
+    items = sum(s.items for s in samples)
+    return {
+        "requests": len(samples),
+        "statuses": statuses,
+        "throughput": len(samples) / wall if wall else 0.0,
+        "itemsPerSecond": items / wall if wall else 0.0,
+        "p50Ms": percentile(seconds, 50) * 1000,
+        "p95Ms": percentile(seconds, 95) * 1000,
+        "p99Ms": percentile(seconds, 99) * 1000,
+        "roundTripsPerRequest": sum(s.round_trips for s in samples) / len(samples) if samples else 0.0,
+        "roundTripsPerItem": sum(s.round_trips for s in samples) / items if items else 0.0,
+    }
+
+
+def print_report(report: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'benchmark':<26}{'reqs':>7}{'req/s':>11}{'items/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'db/req':>8}  statuses"
+    print(header)
+    print("-" * len(header))
+    for name, r in report.items():
+        statuses = " ".join(f"{k}x{v}" for k, v in sorted(r["statuses"].items()))
+        print(
+            f"{name:<26}{r['requests']:>7}{r['throughput']:>11.1f}{r['itemsPerSecond']:>11.1f}"
+            f"{r['p50Ms']:>9.2f}{r['p95Ms']:>9.2f}{r['p99Ms']:>9.2f}{r['roundTripsPerRequest']:>8.2f}  {statuses}"
+        )
+
+
+def compare(report: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    regressions = []
+    for name, r in report.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if r["roundTripsPerRequest"] > base["roundTripsPerRequest"] + 0.01:
+            regressions.append(
+                f"{name}: {r['roundTripsPerRequest']:.2f} DB round trips per request (baseline {base['roundTripsPerRequest']:.2f})"
+            )
+        if base["p95Ms"] > 0 and r["p95Ms"] > base["p95Ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {r['p95Ms']:.2f}ms (baseline {base['p95Ms']:.2f}ms, tolerance {tolerance:.0%})")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    args.password_hash = main._hash_password(BENCH_PASSWORD)
+    args.failures = []
+    report: Dict[str, Dict[str, Any]] = {}
+    try:
+        for name in args.scenarios:
+            for bench, samples in (await SCENARIOS[name](args, rng)).items():
+                report[bench] = summarize(samples)
+    finally:
+        main._driver = None
+        if main._password_executor is not None:
+            main._password_executor.shutdown(wait=False)
+            main._password_executor = None
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the booking backend against an in-memory Neo4j stand-in")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--scale", type=int, default=1, help="multiplies users, appointments and slots per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="in-flight requests per scenario")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="simulated seconds per database round trip")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="fail if round trips or p95 regress against a saved JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase for --compare")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    for line in args.failures:
+        print(f"FAIL {line}")
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+    sys.exit(1 if regressions or args.failures else 0)
@@ -1,18 +1,54 @@
+import asyncio
+import base64
+import binascii
+import contextvars
+import hashlib
+import json
+import logging
 import os
-from datetime import date, datetime, time
-from typing import Any, Dict, List, Optional
+import random
+import re
+import sys
+import tempfile
+import traceback
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from time import monotonic, perf_counter, time as wall_time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from uuid import uuid4
+from zoneinfo import ZoneInfo
 
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
+from neo4j.exceptions import ConstraintError
+from neo4j.time import Date as Neo4jDate, DateTime as Neo4jDateTime, Time as Neo4jTime
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr, Field
 
+try:
+    import jwt as _pyjwt
+except ImportError:
+    _pyjwt = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis.asyncio as _aioredis
+except ImportError:
+    _aioredis = None
+
 _ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 
@@ -48,6 +84,61 @@ NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 JWT_SECRET = os.getenv("JWT_SECRET")
 PORT = int(os.getenv("PORT", "5000"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+AVAILABILITY_CACHE_TTL = float(os.getenv("AVAILABILITY_CACHE_TTL", "30"))
+STARTUP_BOOTSTRAP = os.getenv("STARTUP_BOOTSTRAP", "verify").lower()
+QUEUE_WS_PING_INTERVAL = float(os.getenv("QUEUE_WS_PING_INTERVAL", "25"))
+QUEUE_WS_BUFFER = int(os.getenv("QUEUE_WS_BUFFER", "8"))
+QUEUE_WS_AUTH_TIMEOUT = float(os.getenv("QUEUE_WS_AUTH_TIMEOUT", "10"))
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread").lower()
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "32"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))
+JWT_TTL_SECONDS = int(os.getenv("JWT_TTL_SECONDS", str(7 * 24 * 3600)))
+JWT_BACKEND = os.getenv("JWT_BACKEND", "auto").lower()
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "60"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG_MS = float(os.getenv("SLOW_QUERY_LOG_MS", str(SLOW_QUERY_MS)))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "15"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "1800"))
+NEO4J_LIVENESS_CHECK_TIMEOUT = os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT")
+NEO4J_MAX_RETRY_TIME = float(os.getenv("NEO4J_MAX_RETRY_TIME", "15"))
+NEO4J_WARM_CONNECTIONS = int(os.getenv("NEO4J_WARM_CONNECTIONS", "2"))
+NEO4J_CONNECT_ATTEMPTS = int(os.getenv("NEO4J_CONNECT_ATTEMPTS", "3"))
+NEO4J_CONNECT_COOLDOWN = float(os.getenv("NEO4J_CONNECT_COOLDOWN", "5"))
+NEO4J_RUN_RETRIES = int(os.getenv("NEO4J_RUN_RETRIES", "2"))
+ETA_DEFAULT_MINUTES = float(os.getenv("ETA_DEFAULT_MINUTES", "10"))
+ETA_MIN_SAMPLES = int(os.getenv("ETA_MIN_SAMPLES", "3"))
+ETA_WINDOW = int(os.getenv("ETA_WINDOW", "50"))
+ETA_QUANTILE = float(os.getenv("ETA_QUANTILE", "0.5"))
+ETA_MAX_SAMPLE_MINUTES = float(os.getenv("ETA_MAX_SAMPLE_MINUTES", "120"))
+ETA_CACHE_TTL = float(os.getenv("ETA_CACHE_TTL", "60"))
+APP_TIMEZONE = os.getenv("APP_TIMEZONE")
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "3600"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+DASHBOARD_DAYS = int(os.getenv("DASHBOARD_DAYS", "14"))
+DASHBOARD_MAX_DAYS = int(os.getenv("DASHBOARD_MAX_DAYS", "92"))
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_MAX_BATCHES = int(os.getenv("ARCHIVE_MAX_BATCHES", "100"))
+RATE_LIMIT_LOGIN_IP = os.getenv("RATE_LIMIT_LOGIN_IP", "10/60")
+RATE_LIMIT_SIGNUP_IP = os.getenv("RATE_LIMIT_SIGNUP_IP", "5/600")
+RATE_LIMIT_BOOKING_USER = os.getenv("RATE_LIMIT_BOOKING_USER", "10/60")
+RATE_LIMIT_BOOKING_IP = os.getenv("RATE_LIMIT_BOOKING_IP", "60/60")
+RATE_LIMIT_TRUST_PROXY = int(os.getenv("RATE_LIMIT_TRUST_PROXY", "0"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+REDIS_URL = os.getenv("REDIS_URL")
+EVENT_BUS = os.getenv("EVENT_BUS", "auto").lower()
+EVENT_BUS_DIR = os.getenv("EVENT_BUS_DIR", os.path.join(tempfile.gettempdir(), f"booking-events-{PORT}"))
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "booking:events")
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "auto").lower()
+NEO4J_URI_CACHE = os.getenv("NEO4J_URI_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".neo4j_uri"))
 
 if not JWT_SECRET:
     raise RuntimeError("JWT_SECRET is not set")
@@ -56,11 +147,133 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer(auto_error=False)
 
 _driver = None
+_driver_lock = asyncio.Lock()
+_driver_failed_at: Optional[float] = None
+_driver_error: Optional[str] = None
+
+
+def _candidate_uris(u: str) -> List[str]:
+    candidates = [u]
+    if u.startswith("neo4j+s://"):
+        host = u[len("neo4j+s://") :]
+        candidates.append("neo4j+ssc://" + host)
+        candidates.append("bolt+s://" + host)
+        candidates.append("bolt+ssc://" + host)
+    elif u.startswith("neo4j+ssc://"):
+        host = u[len("neo4j+ssc://") :]
+        candidates.append("bolt+ssc://" + host)
+    elif u.startswith("bolt+s://"):
+        host = u[len("bolt+s://") :]
+        candidates.append("bolt+ssc://" + host)
+    elif u.startswith("bolt+ssc://"):
+        pass
+    return candidates
+
+
+def _unverified(uri: str) -> bool:
+    return uri.split("://", 1)[0].endswith("+ssc")
+
+
+def _read_cached_uri(candidates: List[str]) -> Optional[str]:
+    try:
+        with open(NEO4J_URI_CACHE, encoding="utf-8") as f:
+            cached = f.read().strip()
+    except OSError:
+        return None
+    # An unverified scheme written by an older build is ignored so the verified one is re-probed.
+    return cached if cached in candidates and not _unverified(cached) else None
+
+
+def _write_cached_uri(uri: str) -> None:
+    if _unverified(uri):
+        # Never pin a fallback that skips certificate checks; the next start probes +s again.
+        try:
+            os.remove(NEO4J_URI_CACHE)
+        except OSError:
+            pass
+        return
+    try:
+        with open(NEO4J_URI_CACHE, "w", encoding="utf-8") as f:
+            f.write(uri)
+    except OSError:
+        pass
+
+
+def _backoff(attempt: int, base: float = 0.25, cap: float = 4.0) -> float:
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+
+def _retryable(error: BaseException) -> bool:
+    is_retryable = getattr(error, "is_retryable", None)
+    return bool(is_retryable()) if callable(is_retryable) else False
+
 
+def _driver_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+        "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT,
+        "connection_timeout": NEO4J_CONNECTION_TIMEOUT,
+        "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME,
+        "max_transaction_retry_time": NEO4J_MAX_RETRY_TIME,
+        "keep_alive": True,
+    }
+    if NEO4J_LIVENESS_CHECK_TIMEOUT:
+        options["liveness_check_timeout"] = float(NEO4J_LIVENESS_CHECK_TIMEOUT)
+    return options
 
-def _get_driver():
-    global _driver
-    if _driver is None:
+
+async def _connect(uri: str, auth: Tuple[str, str]) -> Any:
+    candidate = AsyncGraphDatabase.driver(uri, auth=auth, **_driver_options())
+    try:
+        await candidate.verify_connectivity()
+    except BaseException:
+        try:
+            await candidate.close()
+        except Exception:
+            pass
+        raise
+    return candidate
+
+
+async def _probe(candidates: List[str], auth: Tuple[str, str]) -> Tuple[str, Any]:
+    # Probed concurrently; the earliest candidate that works wins.
+    results = await asyncio.gather(*(_connect(uri, auth) for uri in candidates), return_exceptions=True)
+    chosen: Optional[Tuple[str, Any]] = None
+    for uri, result in zip(candidates, results):
+        if isinstance(result, BaseException):
+            continue
+        if chosen is None:
+            chosen = (uri, result)
+        else:
+            await result.close()
+    if chosen is None:
+        raise next(r for r in results if isinstance(r, BaseException))
+    return chosen
+
+
+async def _connect_any(candidates: List[str], auth: Tuple[str, str]) -> Tuple[str, Any]:
+    # Schemes that verify the certificate are tried first; +ssc is only probed when
+    # none of them connects.
+    verified = [uri for uri in candidates if not _unverified(uri)]
+    fallback = [uri for uri in candidates if _unverified(uri)]
+    try:
+        return await _probe(verified, auth) if verified else await _probe(fallback, auth)
+    except Exception as e:
+        if not verified or not fallback:
+            raise
+        error = e
+    uri, driver = await _probe(fallback, auth)
+    print(f"Neo4j TLS warning: connected with {uri} without certificate verification ({error})")
+    return uri, driver
+
+
+async def _get_driver():
+    global _driver, _driver_failed_at, _driver_error
+    if _driver is not None:
+        return _driver
+    async with _driver_lock:
+        if _driver is not None:
+            return _driver
         uri = os.getenv("NEO4J_URI")
         user = os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME")
         password = os.getenv("NEO4J_PASSWORD")
@@ -74,46 +287,57 @@ def _get_driver():
                 ),
             )
 
-        def _candidate_uris(u: str) -> List[str]:
-            candidates = [u]
-            if u.startswith("neo4j+s://"):
-                host = u[len("neo4j+s://") :]
-                candidates.append("neo4j+ssc://" + host)
-                candidates.append("bolt+s://" + host)
-                candidates.append("bolt+ssc://" + host)
-            elif u.startswith("neo4j+ssc://"):
-                host = u[len("neo4j+ssc://") :]
-                candidates.append("bolt+ssc://" + host)
-            elif u.startswith("bolt+s://"):
-                host = u[len("bolt+s://") :]
-                candidates.append("bolt+ssc://" + host)
-            elif u.startswith("bolt+ssc://"):
-                pass
-            return candidates
-
-        last_error: Optional[Exception] = None
-        for attempt_uri in _candidate_uris(uri):
+        if _driver_failed_at is not None and monotonic() - _driver_failed_at < NEO4J_CONNECT_COOLDOWN:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Database unavailable: {_driver_error}",
+                headers={"Retry-After": str(max(1, round(NEO4J_CONNECT_COOLDOWN)))},
+            )
+
+        candidates = _candidate_uris(uri)
+        cached = _read_cached_uri(candidates)
+        last_error: Optional[BaseException] = None
+        for attempt in range(1, max(1, NEO4J_CONNECT_ATTEMPTS) + 1):
             try:
-                candidate = GraphDatabase.driver(attempt_uri, auth=(user, password))
-                candidate.verify_connectivity()
-                _driver = candidate
+                if cached is not None:
+                    try:
+                        _driver = _InstrumentedDriver(await _connect(cached, (user, password)))
+                        break
+                    except Exception as e:
+                        last_error = e
+                        cached = None
+                working_uri, driver = await _connect_any(candidates, (user, password))
+                _driver = _InstrumentedDriver(driver)
+                _write_cached_uri(working_uri)
                 break
             except Exception as e:
                 last_error = e
-                try:
-                    candidate.close()
-                except Exception:
-                    pass
-                continue
+                if attempt < NEO4J_CONNECT_ATTEMPTS:
+                    await asyncio.sleep(_backoff(attempt))
 
         if _driver is None:
+            _driver_failed_at = monotonic()
+            _driver_error = str(last_error)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=f"Database unavailable: {last_error}",
+                headers={"Retry-After": str(max(1, round(NEO4J_CONNECT_COOLDOWN)))},
             )
+        _driver_failed_at = None
+        _driver_error = None
     return _driver
 
 
+async def _warm_pool(driver: Any, connections: int) -> int:
+    async def _ping() -> None:
+        async with driver.session() as session:
+            result = await session.run("RETURN 1")
+            await result.consume()
+
+    results = await asyncio.gather(*(_ping() for _ in range(connections)), return_exceptions=True)
+    return sum(1 for r in results if not isinstance(r, BaseException))
+
+
 def _serialize_value(v: Any) -> Any:
     if hasattr(v, "to_native"):
         try:
@@ -143,6 +367,50 @@ def _node_to_dict(node: Any) -> Dict[str, Any]:
         raise
 
 
+_TEMPORAL_TYPES = (Neo4jDate, Neo4jDateTime, Neo4jTime, date, time)
+
+
+def _record_converter(drop: Tuple[str, ...] = ()) -> Callable[[Any], Dict[str, Any]]:
+    # Temporal values are the only stored properties that are not already JSON types,
+    # so they are converted wherever they appear and the per-value recursion of
+    # _serialize_value is skipped for everything else.
+    def convert(value: Any) -> Dict[str, Any]:
+        props = dict(value)
+        for key in drop:
+            props.pop(key, None)
+        for key, v in props.items():
+            if isinstance(v, _TEMPORAL_TYPES):
+                props[key] = _serialize_value(v)
+        return props
+
+    return convert
+
+
+_appointment_to_dict = _record_converter()
+_service_to_dict = _record_converter()
+# bookingLockedAt is left on users by builds that kept the booking lock as a property.
+_user_to_dict = _record_converter(drop=("password", "bookingLockedAt"))
+_availability_props = _record_converter()
+
+
+def _json_default(value: Any) -> Any:
+    converted = _serialize_value(value)
+    if converted is value:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return converted
+
+
+def _dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+class _FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
+
+
 def _hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -151,15 +419,839 @@ def _verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
 
 
+_password_executor: Optional[Executor] = None
+_password_in_flight = 0
+_password_pool_stats: Dict[str, Any] = {
+    "submitted": 0,
+    "completed": 0,
+    "rejected": 0,
+    "waitSecondsTotal": 0.0,
+    "waitSecondsMax": 0.0,
+    "runSecondsTotal": 0.0,
+}
+
+
+def _get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        workers = max(1, PASSWORD_POOL_WORKERS)
+        if PASSWORD_POOL_KIND == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _password_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+    return _password_executor
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> Tuple[float, Any]:
+    started = perf_counter()
+    result = fn(*args)
+    return perf_counter() - started, result
+
+
+async def _run_password_work(fn: Callable[..., Any], *args: Any) -> Any:
+    global _password_in_flight
+    if _password_in_flight >= max(1, PASSWORD_POOL_WORKERS) + max(0, PASSWORD_POOL_MAX_PENDING):
+        _password_pool_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    _password_in_flight += 1
+    _password_pool_stats["submitted"] += 1
+    submitted = perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        run_seconds, result = await loop.run_in_executor(_get_password_executor(), _timed_call, fn, *args)
+    finally:
+        _password_in_flight -= 1
+
+    wait_seconds = max(0.0, perf_counter() - submitted - run_seconds)
+    _password_pool_stats["completed"] += 1
+    _password_pool_stats["waitSecondsTotal"] += wait_seconds
+    _password_pool_stats["runSecondsTotal"] += run_seconds
+    if wait_seconds > _password_pool_stats["waitSecondsMax"]:
+        _password_pool_stats["waitSecondsMax"] = wait_seconds
+    return result
+
+
+async def _hash_password_async(password: str) -> str:
+    return await _run_password_work(_hash_password, password)
+
+
+async def _verify_password_async(password: str, hashed: str) -> bool:
+    return await _run_password_work(_verify_password, password, hashed)
+
+
+def _password_pool_snapshot() -> Dict[str, Any]:
+    completed = _password_pool_stats["completed"]
+    return {
+        **_password_pool_stats,
+        "kind": PASSWORD_POOL_KIND,
+        "workers": max(1, PASSWORD_POOL_WORKERS),
+        "maxPending": max(0, PASSWORD_POOL_MAX_PENDING),
+        "inFlight": _password_in_flight,
+        "waitSecondsAvg": (_password_pool_stats["waitSecondsTotal"] / completed) if completed else 0.0,
+    }
+
+
+class _TTLCache:
+    def __init__(self, name: str, ttl: float, max_entries: int = 256) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._loading: Dict[Hashable, Tuple[int, "asyncio.Future[Any]"]] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > monotonic():
+                self.hits += 1
+                return entry[1]
+
+            pending = self._loading.get(key)
+            if pending is None:
+                break
+            started, shared = pending
+            value = await asyncio.shield(shared)
+            # A load that began before an invalidation may carry the old value; look again.
+            if started == self._generation:
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        generation = self._generation
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._loading[key] = (generation, future)
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+        future.set_result(value)
+        if generation == self._generation and self.ttl > 0:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (monotonic() + self.ttl, value)
+        return value
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def invalidate(self, keys: Optional[Iterable[Hashable]] = None) -> None:
+        self._generation += 1
+        if keys is None:
+            self._entries.clear()
+        else:
+            for key in keys:
+                self._entries.pop(key, None)
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+_catalog_cache = _TTLCache("catalog", CATALOG_CACHE_TTL)
+_availability_cache = _TTLCache("availability", AVAILABILITY_CACHE_TTL)
+_timing_cache = _TTLCache("timings", ETA_CACHE_TTL)
+_eta_cache = _TTLCache("eta", ETA_CACHE_TTL)
+_queue_cache = _TTLCache("queue", ETA_CACHE_TTL, max_entries=TOKEN_CACHE_SIZE)
+_profile_cache = _TTLCache("profiles", PROFILE_CACHE_TTL, max_entries=TOKEN_CACHE_SIZE)
+_idempotency_cache = _TTLCache("idempotency", IDEMPOTENCY_TTL, max_entries=IDEMPOTENCY_MAX_KEYS)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {value:g}")
+        return lines
+
+
+class _Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), labels + (le,))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {series[-1]:g}")
+        return lines
+
+
+_http_requests = _Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+_http_latency = _Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"), _LATENCY_BUCKETS
+)
+_http_db_queries = _Histogram("http_request_db_queries", "Cypher statements issued per HTTP request.", ("route",), _COUNT_BUCKETS)
+_http_unhandled = _Counter("http_unhandled_exceptions_total", "Requests that failed with an unhandled exception.", ("route",))
+_db_latency = _Histogram("neo4j_query_duration_seconds", "Cypher run latency by query name.", ("query",), _LATENCY_BUCKETS)
+_db_rows = _Counter("neo4j_query_rows_total", "Records read by query name.", ("query",))
+_db_errors = _Counter("neo4j_query_errors_total", "Failed Cypher runs by query name.", ("query",))
+_slow_query_log = logging.getLogger("booking.slow_queries")
+_db_slow = _Counter("neo4j_slow_queries_total", f"Cypher runs slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g}ms).", ("query",))
+_http_rate_limited = _Counter("http_rate_limited_total", "Requests rejected with 429 by rate-limit rule and key.", ("rule", "key"))
+_query_names: Dict[Any, str] = {}
+_request_db_queries: "contextvars.ContextVar[Optional[List[int]]]" = contextvars.ContextVar("request_db_queries", default=None)
+
+
+class _InstrumentedResult:
+    __slots__ = ("_result", "_name", "_iterator")
+
+    def __init__(self, result: Any, name: str) -> None:
+        self._result = result
+        self._name = name
+        self._iterator = None
+
+    def __aiter__(self) -> "_InstrumentedResult":
+        self._iterator = self._result.__aiter__()
+        return self
+
+    async def __anext__(self) -> Any:
+        record = await self._iterator.__anext__()
+        _db_rows.inc((self._name,))
+        return record
+
+    async def single(self, *args: Any, **kwargs: Any) -> Any:
+        record = await self._result.single(*args, **kwargs)
+        if record is not None:
+            _db_rows.inc((self._name,))
+        return record
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._result, item)
+
+
+_WRITE_CLAUSE = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|FOREACH|CALL|LOAD)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _read_only(query: str) -> bool:
+    return _WRITE_CLAUSE.search(query) is None
+
+
+class _InstrumentedRunner:
+    retries = 0
+
+    def __init__(self, inner: Any) -> None:
+        self._inner = inner
+
+    async def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs: Any) -> _InstrumentedResult:
+        code = sys._getframe(1).f_code
+        name = _query_names.get(code)
+        if name is None:
+            name = _query_names[code] = getattr(code, "co_qualname", code.co_name).replace(".<locals>", "")
+        calls = _request_db_queries.get()
+        retries = self.retries if self.retries and _read_only(query) else 0
+        attempt = 0
+        while True:
+            if calls is not None:
+                calls[0] += 1
+            started = perf_counter()
+            try:
+                result = await self._inner.run(query, parameters, **kwargs)
+                break
+            except Exception as e:
+                _db_errors.inc((name,))
+                attempt += 1
+                if attempt > retries or not _retryable(e):
+                    raise
+            finally:
+                elapsed = perf_counter() - started
+                _db_latency.observe((name,), elapsed)
+                if elapsed * 1000 >= SLOW_QUERY_MS:
+                    _db_slow.inc((name,))
+                if elapsed * 1000 >= SLOW_QUERY_LOG_MS and _slow_query_log.isEnabledFor(logging.WARNING):
+                    _slow_query_log.warning("Slow query %s: %.1fms: %s", name, elapsed * 1000, " ".join(query.split())[:200])
+            await asyncio.sleep(_backoff(attempt))
+        return _InstrumentedResult(result, name)
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._inner, item)
+
+
+class _InstrumentedSession(_InstrumentedRunner):
+    # Managed transactions are retried by the driver itself; auto-commit runs are not,
+    # so transient failures (e.g. a dropped pooled connection) get a bounded retry here.
+    # Only read-only statements are retried: a write may have committed before the
+    # connection dropped, and running it again would duplicate it.
+    retries = NEO4J_RUN_RETRIES
+
+    async def __aenter__(self) -> "_InstrumentedSession":
+        await self._inner.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> Any:
+        return await self._inner.__aexit__(*exc)
+
+    async def execute_write(self, work: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        return await self._inner.execute_write(lambda tx, *a, **kw: work(_InstrumentedRunner(tx), *a, **kw), *args, **kwargs)
+
+    async def execute_read(self, work: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        return await self._inner.execute_read(lambda tx, *a, **kw: work(_InstrumentedRunner(tx), *a, **kw), *args, **kwargs)
+
+
+class _InstrumentedDriver:
+    def __init__(self, driver: Any) -> None:
+        self._inner = driver
+
+    def session(self, **kwargs: Any) -> _InstrumentedSession:
+        return _InstrumentedSession(self._inner.session(**kwargs))
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._inner, item)
+
+
+_BOOT_ID = uuid4().hex[:12]
+
+
+class _LocalEventBus:
+    name = "local"
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+
+    async def start(self, deliver: Callable[[str, Dict[str, Any]], None]) -> None:
+        pass
+
+    def publish(self, kind: str, payload: Dict[str, Any]) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "sent": self.sent, "received": self.received, "errors": self.errors}
+
+
+class _UDPEventBus(_LocalEventBus, asyncio.DatagramProtocol):
+    # Workers on one host announce their loopback port as an empty file in a shared
+    # directory and send each other events as datagrams; no external service needed.
+    name = "udp"
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self.directory = directory
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._deliver: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        self._own: Optional[str] = None
+        self._peers: List[int] = []
+        self._listed_at: Optional[int] = None
+
+    async def start(self, deliver: Callable[[str, Dict[str, Any]], None]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._deliver = deliver
+        self._transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: self, local_addr=("127.0.0.1", 0)
+        )
+        port = self._transport.get_extra_info("sockname")[1]
+        self._own = f"{os.getpid()}-{port}.port"
+        open(os.path.join(self.directory, self._own), "w").close()
+
+    def _peer_ports(self) -> List[int]:
+        # The directory mtime changes whenever a worker joins or leaves, so the
+        # listing is only re-read then.
+        listed_at = os.stat(self.directory).st_mtime_ns
+        if listed_at != self._listed_at:
+            self._listed_at = listed_at
+            peers = []
+            for entry in os.listdir(self.directory):
+                if not entry.endswith(".port") or entry == self._own:
+                    continue
+                pid, _, port = entry[: -len(".port")].partition("-")
+                if not self._alive(int(pid)):
+                    self._forget(entry)
+                    continue
+                peers.append(int(port))
+            self._peers = peers
+        return self._peers
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        if os.name != "posix":
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _forget(self, entry: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, entry))
+        except OSError:
+            pass
+
+    def publish(self, kind: str, payload: Dict[str, Any]) -> None:
+        if self._transport is None:
+            return
+        try:
+            ports = self._peer_ports()
+        except OSError:
+            self.errors += 1
+            return
+        data = _dumps({"k": kind, "p": payload})
+        for port in ports:
+            self._transport.sendto(data, ("127.0.0.1", port))
+            self.sent += 1
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            self.errors += 1
+            return
+        self.received += 1
+        if self._deliver is not None:
+            self._deliver(message["k"], message["p"])
+
+    def error_received(self, exc: Exception) -> None:
+        self.errors += 1
+
+    async def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._own is not None:
+            self._forget(self._own)
+            self._own = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "peers": len(self._peers)}
+
+
+class _RedisEventBus(_LocalEventBus):
+    name = "redis"
+
+    def __init__(self, url: str, channel: str) -> None:
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._client: Any = None
+        self._listener: Optional["asyncio.Task[None]"] = None
+
+    async def start(self, deliver: Callable[[str, Dict[str, Any]], None]) -> None:
+        self._client = _redis_client()
+        self._listener = asyncio.ensure_future(self._listen(deliver))
+
+    async def _listen(self, deliver: Callable[[str, Dict[str, Any]], None]) -> None:
+        # Events published while the subscription was down are lost, so every
+        # reconnect starts with a resync that drops all local caches.
+        connected_before = False
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if connected_before:
+                    deliver("resync", {})
+                connected_before = True
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    if event["o"] == _BOOT_ID:
+                        continue
+                    self.received += 1
+                    deliver(event["k"], event["p"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"Event bus warning: {e!r}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def publish(self, kind: str, payload: Dict[str, Any]) -> None:
+        if self._client is not None:
+            _spawn(self._publish(_dumps({"o": _BOOT_ID, "k": kind, "p": payload})))
+
+    async def _publish(self, data: bytes) -> None:
+        try:
+            await self._client.publish(self.channel, data)
+            self.sent += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Event bus warning: {e!r}")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+
+_redis: Any = None
+
+
+def _redis_client() -> Any:
+    global _redis
+    if _redis is None:
+        _redis = _aioredis.from_url(REDIS_URL)
+    return _redis
+
+
+def _select_backend(setting: str, names: Tuple[str, ...], fallback: str) -> str:
+    if setting not in ("auto",) + names:
+        raise RuntimeError(f"Unknown backend {setting!r}, expected one of auto, {', '.join(names)}")
+    if setting == "redis" and (_aioredis is None or not REDIS_URL):
+        raise RuntimeError("The redis backend needs REDIS_URL and the redis package (pip install redis)")
+    if setting == "auto":
+        return "redis" if REDIS_URL and _aioredis is not None else fallback
+    return setting
+
+
+def _make_event_bus() -> _LocalEventBus:
+    backend = _select_backend(EVENT_BUS, ("local", "udp", "redis"), "udp")
+    if backend == "redis":
+        return _RedisEventBus(REDIS_URL, EVENT_BUS_CHANNEL)
+    if backend == "udp":
+        return _UDPEventBus(EVENT_BUS_DIR)
+    return _LocalEventBus()
+
+
+_event_bus = _make_event_bus()
+_event_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+
+
+def _on_event(kind: str) -> Callable[[Callable[[Dict[str, Any]], None]], Callable[[Dict[str, Any]], None]]:
+    def register(handler: Callable[[Dict[str, Any]], None]) -> Callable[[Dict[str, Any]], None]:
+        _event_handlers[kind] = handler
+        return handler
+
+    return register
+
+
+def _emit(kind: str, payload: Optional[Dict[str, Any]] = None) -> None:
+    # Applied here first, then replayed by every other worker through the bus.
+    payload = payload or {}
+    _event_handlers[kind](payload)
+    _event_bus.publish(kind, payload)
+
+
+def _deliver_event(kind: str, payload: Dict[str, Any]) -> None:
+    handler = _event_handlers.get(kind)
+    if handler is not None:
+        handler(payload)
+
+
+@_on_event("catalog")
+def _apply_catalog_changed(_: Dict[str, Any]) -> None:
+    _catalog_cache.invalidate()
+
+
+@_on_event("availability")
+def _apply_availability_changed(_: Dict[str, Any]) -> None:
+    _availability_cache.invalidate()
+
+
+@_on_event("timings")
+def _apply_timings_changed(_: Dict[str, Any]) -> None:
+    _timing_cache.invalidate()
+    _eta_cache.invalidate()
+    _queue_cache.invalidate()
+
+
+@_on_event("profiles")
+def _apply_profiles_changed(_: Dict[str, Any]) -> None:
+    _profile_cache.invalidate()
+
+
+@_on_event("resync")
+def _apply_resync(_: Dict[str, Any]) -> None:
+    for cache in (_catalog_cache, _availability_cache, _profile_cache, _timing_cache, _eta_cache, _queue_cache):
+        cache.invalidate()
+
+
+def _catalog_changed() -> None:
+    _emit("catalog")
+
+
+def _availability_changed() -> None:
+    _emit("availability")
+
+
+class _QueueHub:
+    def __init__(self, buffer_size: int) -> None:
+        self.buffer_size = max(1, buffer_size)
+        self._subscribers: Dict[str, Set["asyncio.Queue[Dict[str, Any]]"]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: str) -> "asyncio.Queue[Dict[str, Any]]":
+        queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=self.buffer_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: "asyncio.Queue[Dict[str, Any]]") -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def user_ids(self) -> List[str]:
+        return list(self._subscribers)
+
+    def publish(self, user_id: str, message: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(user_id, ()):
+            # A slow client only needs the latest position, so the oldest update is dropped.
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+            self.published += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(q) for q in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+_queue_hub = _QueueHub(QUEUE_WS_BUFFER)
+_background_tasks: Set["asyncio.Task[Any]"] = set()
+
+
+def _spawn(coro: Awaitable[Any]) -> None:
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _publish_queue_positions(appointment_id: Optional[str], dates: List[str], user_ids: List[str]) -> None:
+    try:
+        driver = await _get_driver()
+        async with driver.session() as session:
+            result = await session.run(
+                "MATCH (u:User)-[:HAS_APPOINTMENT]->(a:Appointment) "
+                "WHERE u.id IN $userIds AND (a.id = $id OR (a.status = 'approved' AND a.date IN $dates)) "
+                "RETURN u.id AS userId, a",
+                userIds=user_ids,
+                id=appointment_id,
+                dates=dates,
+            )
+            rows = [(r["userId"], _appointment_to_dict(r["a"])) async for r in result]
+        for user_id, appointment in rows:
+            eta = await _attach_eta(appointment)
+            _queue_hub.publish(
+                user_id,
+                {"type": "queue", "queueNumber": appointment.get("queueNumber"), "appointment": appointment, "eta": eta},
+            )
+    except Exception as e:
+        print(f"Queue push warning: {e}")
+
+
+@_on_event("queue")
+def _apply_queue_changed(payload: Dict[str, Any]) -> None:
+    appointment_id, dates = payload.get("id"), payload.get("dates") or []
+    # A change without dates (a new pending booking) leaves every approved queue and
+    # its ETAs as they were; only the booker's own snapshot is stale.
+    if dates:
+        _eta_cache.invalidate(dates)
+        _queue_cache.invalidate()
+    elif payload.get("userId"):
+        _queue_cache.invalidate([payload["userId"]])
+    user_ids = _queue_hub.user_ids()
+    if user_ids and (appointment_id or dates):
+        _spawn(_publish_queue_positions(appointment_id, dates, user_ids))
+
+
+def _queue_changed(
+    appointment_id: Optional[str] = None, dates: Tuple[Optional[str], ...] = (), user_id: Optional[str] = None
+) -> None:
+    _emit("queue", {"id": appointment_id, "dates": sorted({d for d in dates if d}), "userId": user_id})
+
+
+def _content_etag(name: str, content: Any) -> str:
+    # Hashed from the payload itself, so every worker, and a restarted one, hands out
+    # the same tag for the same data.
+    if orjson is not None:
+        raw = orjson.dumps(content, default=_json_default, option=orjson.OPT_SORT_KEYS)
+    else:
+        raw = json.dumps(content, sort_keys=True, separators=(",", ":"), default=_json_default).encode("utf-8")
+    return f'W/"{name}-{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+
+async def _tagged(name: str, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+    # Cached alongside the payload, so a conditional hit costs neither a query nor a hash.
+    content = await loader()
+    return content, _content_etag(name, content)
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    if _not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
+
+_USE_PYJWT = _pyjwt is not None and JWT_BACKEND in ("auto", "pyjwt")
+
+
 def _create_token(user_id: str, email: str, role: str) -> str:
-    payload = {"userId": user_id, "email": email, "role": role}
+    issued = int(wall_time())
+    payload: Dict[str, Any] = {"userId": user_id, "email": email, "role": role, "iat": issued, "jti": uuid4().hex}
+    if JWT_TTL_SECONDS > 0:
+        payload["exp"] = issued + JWT_TTL_SECONDS
+    if _USE_PYJWT:
+        return _pyjwt.encode(payload, JWT_SECRET, algorithm="HS256")
     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 
 def _decode_token(token: str) -> Dict[str, Any]:
+    if _USE_PYJWT:
+        try:
+            return _pyjwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        except _pyjwt.InvalidTokenError as e:
+            raise JWTError(str(e))
     return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
 
 
+_token_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_token_cache_stats = {"hits": 0, "misses": 0}
+_revoked_tokens: Dict[str, float] = {}
+
+
+def _token_expired(claims: Dict[str, Any]) -> bool:
+    exp = claims.get("exp")
+    return exp is not None and exp <= wall_time()
+
+
+def _verify_token(token: str) -> Dict[str, Any]:
+    claims = _token_cache.get(token)
+    if claims is not None:
+        _token_cache_stats["hits"] += 1
+        _token_cache.move_to_end(token)
+    else:
+        _token_cache_stats["misses"] += 1
+        claims = _decode_token(token)
+        if TOKEN_CACHE_SIZE > 0:
+            _token_cache[token] = claims
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    if _token_expired(claims) or claims.get("jti") in _revoked_tokens:
+        _token_cache.pop(token, None)
+        raise JWTError("Token expired or revoked")
+    return claims
+
+
+def _remember_revoked(jti: str, expires_at: Optional[float]) -> None:
+    now = wall_time()
+    for stale in [k for k, exp in _revoked_tokens.items() if exp <= now]:
+        del _revoked_tokens[stale]
+    _revoked_tokens[jti] = expires_at if expires_at is not None else float("inf")
+
+
+@_on_event("revoke")
+def _apply_revoke(payload: Dict[str, Any]) -> None:
+    _remember_revoked(payload["jti"], payload.get("exp"))
+
+
+async def _load_revoked_tokens(session) -> int:
+    result = await session.run(
+        "MATCH (r:RevokedToken) WHERE r.expiresAt IS NULL OR r.expiresAt > $now "
+        "RETURN r.jti AS jti, r.expiresAt AS expiresAt",
+        now=wall_time(),
+    )
+    loaded = 0
+    async for r in result:
+        _remember_revoked(r["jti"], r["expiresAt"])
+        loaded += 1
+    return loaded
+
+
+def _token_cache_snapshot() -> Dict[str, Any]:
+    return {
+        "backend": "pyjwt" if _USE_PYJWT else "jose",
+        "entries": len(_token_cache),
+        "maxEntries": TOKEN_CACHE_SIZE,
+        "hits": _token_cache_stats["hits"],
+        "misses": _token_cache_stats["misses"],
+        "revoked": len(_revoked_tokens),
+    }
+
+
 class SignupRequest(BaseModel):
     name: str = Field(..., min_length=1)
     email: EmailStr
@@ -208,25 +1300,38 @@ class AppointmentDecision(BaseModel):
     estimatedTime: Optional[str] = None
 
 
-def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> Dict[str, Any]:
+class BulkAppointmentDecision(BaseModel):
+    ids: List[str] = Field(..., min_length=1)
+    estimatedTime: Optional[str] = None
+
+
+class BulkAvailabilityCreate(BaseModel):
+    dateFrom: str
+    dateTo: str
+    times: List[str] = Field(..., min_length=1)
+    slots: int = 10
+    weekdays: Optional[List[int]] = None
+
+
+async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> Dict[str, Any]:
     if credentials is None or not credentials.credentials:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No token, authorization denied")
 
     token = credentials.credentials
     try:
-        payload = _decode_token(token)
+        payload = _verify_token(token)
         return payload
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token is not valid")
 
 
-def require_admin(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+async def require_admin(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     if user.get("role") != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied. Admin only.")
     return user
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=_FastJSONResponse)
 
 
 @app.exception_handler(HTTPException)
@@ -234,7 +1339,7 @@ async def http_exception_handler(_, exc: HTTPException):
     message = exc.detail
     if isinstance(message, dict):
         message = message.get("message") or message.get("detail") or "Request failed"
-    return JSONResponse(status_code=exc.status_code, content={"message": str(message)})
+    return JSONResponse(status_code=exc.status_code, content={"message": str(message)}, headers=exc.headers)
 
 
 @app.exception_handler(RequestValidationError)
@@ -246,10 +1351,173 @@ async def validation_exception_handler(_, exc: RequestValidationError):
 
 
 @app.exception_handler(Exception)
-async def unhandled_exception_handler(_, __):
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    route = _route_label(request.scope)
+    _http_unhandled.inc((route,))
+    print(f"Unhandled error on {request.method} {route}: {exc!r}")
+    traceback.print_exception(type(exc), exc, exc.__traceback__)
     return JSONResponse(status_code=500, content={"message": "Server error"})
 
 
+def _parse_budget(spec: str) -> Optional[Tuple[float, float]]:
+    # "10/60" allows a burst of 10 and refills 10 tokens every 60 seconds; "0" disables.
+    try:
+        count, _, per = spec.partition("/")
+        capacity = float(count)
+        seconds = float(per or "1")
+    except ValueError:
+        raise RuntimeError(f"Invalid rate limit {spec!r}, expected <requests>/<seconds>")
+    if capacity <= 0 or seconds <= 0:
+        return None
+    return capacity, capacity / seconds
+
+
+class _LocalBucketStore:
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max(1, max_keys)
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        # Returns 0 when a token was taken, else the seconds until one is available.
+        # An evicted bucket comes back full, which is what an idle bucket would hold anyway.
+        now = monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / refill_rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {"store": "memory", "keys": len(self._buckets), "maxKeys": self.max_keys}
+
+
+class _RedisBucketStore:
+    # Same bucket arithmetic as _LocalBucketStore, run atomically inside Redis with
+    # its clock so every worker and host draws from one bucket per key.
+    _SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local capacity, rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or capacity
+local at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+    def __init__(self, prefix: str = "booking:ratelimit:") -> None:
+        self.prefix = prefix
+        self._script: Any = None
+        self.errors = 0
+
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        # Fails open: an unreachable Redis must not lock everyone out of logging in.
+        if self._script is None:
+            self._script = _redis_client().register_script(self._SCRIPT)
+        try:
+            return float(await self._script(keys=[self.prefix + key], args=[capacity, refill_rate]))
+        except Exception as e:
+            self.errors += 1
+            print(f"Rate limit store warning: {e!r}")
+            return 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"store": "redis", "errors": self.errors}
+
+
+def _make_rate_limit_store() -> Any:
+    if _select_backend(RATE_LIMIT_STORE, ("memory", "redis"), "memory") == "redis":
+        return _RedisBucketStore()
+    return _LocalBucketStore(RATE_LIMIT_MAX_KEYS)
+
+
+_rate_limit_store: Any = _make_rate_limit_store()
+
+_RATE_LIMIT_RULES: Dict[Tuple[str, str], Tuple[str, Optional[Tuple[float, float]], Optional[Tuple[float, float]]]] = {
+    ("POST", "/api/auth/login"): ("login", _parse_budget(RATE_LIMIT_LOGIN_IP), None),
+    ("POST", "/api/admin/login"): ("login", _parse_budget(RATE_LIMIT_LOGIN_IP), None),
+    ("POST", "/api/auth/signup"): ("signup", _parse_budget(RATE_LIMIT_SIGNUP_IP), None),
+    ("POST", "/api/appointments"): ("booking", _parse_budget(RATE_LIMIT_BOOKING_IP), _parse_budget(RATE_LIMIT_BOOKING_USER)),
+}
+
+
+def _client_ip(scope: Dict[str, Any]) -> str:
+    # Each trusted proxy appends the address it received the request from, so the
+    # client is RATE_LIMIT_TRUST_PROXY entries from the right; anything further left
+    # was sent by the client and could be rotated to dodge the limit.
+    if RATE_LIMIT_TRUST_PROXY > 0:
+        hops = [
+            part.strip()
+            for name, value in scope["headers"]
+            if name == b"x-forwarded-for"
+            for part in value.decode("latin-1").split(",")
+            if part.strip()
+        ]
+        if len(hops) >= RATE_LIMIT_TRUST_PROXY:
+            return hops[-RATE_LIMIT_TRUST_PROXY]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _bearer_user_id(scope: Dict[str, Any]) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return _verify_token(token.strip()).get("userId")
+            except JWTError:
+                return None
+    return None
+
+
+class _RateLimitMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        rule = _RATE_LIMIT_RULES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        name, ip_budget, user_budget = rule
+        checks = []
+        if ip_budget is not None:
+            checks.append(("ip", f"{name}:ip:{_client_ip(scope)}", ip_budget))
+        if user_budget is not None:
+            user_id = _bearer_user_id(scope)
+            if user_id:
+                checks.append(("user", f"{name}:user:{user_id}", user_budget))
+        for kind, key, (capacity, refill_rate) in checks:
+            wait = await _rate_limit_store.take(key, capacity, refill_rate)
+            if wait > 0:
+                _http_rate_limited.inc((name, kind))
+                response = _FastJSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"message": "Too many requests, please try again later"},
+                    headers={"Retry-After": str(max(1, int(wait + 0.999)))},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(_RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -262,109 +1530,266 @@ app.add_middleware(
 )
 
 
-async def _initialize_admin() -> None:
-    admin_email = "admin@registrar.gov"
-    admin_password = "admin123"
-    admin_name = "Administrator"
+_route_paths: Dict[Any, str] = {}
 
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (u:User {email: $email}) RETURN u", email=admin_email)
-        records = list(result)
-        hashed = _hash_password(admin_password)
 
-        if len(records) == 0:
-            session.run(
-                "CREATE (u:User {id: randomUUID(), name: $name, email: $email, password: $password, role: 'admin', createdAt: datetime()})",
-                name=admin_name,
-                email=admin_email,
-                password=hashed,
-            )
-        else:
-            session.run(
-                "MATCH (u:User {email: $email}) SET u.role = 'admin', u.password = $password RETURN u",
-                email=admin_email,
-                password=hashed,
-            )
+def _route_label(scope: Dict[str, Any]) -> str:
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if endpoint not in _route_paths:
+        _route_paths.update({r.endpoint: r.path for r in app.routes if hasattr(r, "endpoint")})
+    return _route_paths.get(endpoint, "unmatched")
 
 
-def _ensure_default_services(session) -> List[Dict[str, Any]]:
-    result = session.run("MATCH (s:Service) RETURN s ORDER BY s.name")
-    services = [_node_to_dict(r["s"]) for r in result]
-    if services:
-        return services
+class _MetricsMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
 
-    default_services = [
-        {
-            "id": "birth-cert",
-            "name": "Birth Certificate",
-            "requirements": [
-                "National ID",
-                "Negative result (PSA)",
-                "Affidavit of delay registration",
-                "Voter certification",
-                "Permanent record",
-            ],
-        },
-        {
-            "id": "marriage-cert",
-            "name": "Marriage Certificate",
-            "requirements": [
-                "Valid ID",
-                "Marriage contract (if applicable)",
-                "PSA Certificate of Marriage",
-                "Affidavit (if needed)",
-            ],
-        },
-        {
-            "id": "no-marriage-cert",
-            "name": "Certificate of No Marriage",
-            "requirements": [
-                "Valid ID",
-                "PSA Certificate of No Marriage",
-                "Barangay Clearance",
-                "Birth Certificate",
-            ],
-        },
-        {
-            "id": "death-reg",
-            "name": "Death Registration",
-            "requirements": [
-                "Valid ID of informant",
-                "Death certificate from hospital/clinic",
-                "PSA Certificate of Death",
-                "Affidavit (if needed)",
-            ],
-        },
-    ]
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    for s in default_services:
-        session.run(
-            "CREATE (s:Service {id: $id, name: $name, requirements: $requirements})",
-            id=s["id"],
-            name=s["name"],
-            requirements=s["requirements"],
-        )
+        status_code = [500]
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
 
-    return default_services
+        calls = [0]
+        reset = _request_db_queries.set(calls)
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - started
+            _request_db_queries.reset(reset)
+            route = _route_label(scope)
+            _http_requests.inc((scope["method"], route, str(status_code[0])))
+            _http_latency.observe((scope["method"], route), elapsed)
+            _http_db_queries.observe((route,), calls[0])
+
+
+app.add_middleware(_MetricsMiddleware)
+
+
+ADMIN_EMAIL = "admin@registrar.gov"
+ADMIN_PASSWORD = "admin123"
+ADMIN_NAME = "Administrator"
+
+_DEFAULT_SERVICES = [
+    {
+        "id": "birth-cert",
+        "name": "Birth Certificate",
+        "requirements": [
+            "National ID",
+            "Negative result (PSA)",
+            "Affidavit of delay registration",
+            "Voter certification",
+            "Permanent record",
+        ],
+    },
+    {
+        "id": "marriage-cert",
+        "name": "Marriage Certificate",
+        "requirements": [
+            "Valid ID",
+            "Marriage contract (if applicable)",
+            "PSA Certificate of Marriage",
+            "Affidavit (if needed)",
+        ],
+    },
+    {
+        "id": "no-marriage-cert",
+        "name": "Certificate of No Marriage",
+        "requirements": [
+            "Valid ID",
+            "PSA Certificate of No Marriage",
+            "Barangay Clearance",
+            "Birth Certificate",
+        ],
+    },
+    {
+        "id": "death-reg",
+        "name": "Death Registration",
+        "requirements": [
+            "Valid ID of informant",
+            "Death certificate from hospital/clinic",
+            "PSA Certificate of Death",
+            "Affidavit (if needed)",
+        ],
+    },
+]
+
+
+async def _initialize_admin(session, reset_password: bool = False) -> str:
+    result = await session.run("MATCH (u:User {email: $email}) RETURN u.role AS role", email=ADMIN_EMAIL)
+    record = await result.single()
+
+    if record is None:
+        hashed = await _hash_password_async(ADMIN_PASSWORD)
+        result = await session.run(
+            "CREATE (u:User {id: randomUUID(), name: $name, email: $email, password: $password, role: 'admin', createdAt: datetime()})",
+            name=ADMIN_NAME,
+            email=ADMIN_EMAIL,
+            password=hashed,
+        )
+        await result.consume()
+        return "created"
+
+    if reset_password:
+        hashed = await _hash_password_async(ADMIN_PASSWORD)
+        result = await session.run(
+            "MATCH (u:User {email: $email}) SET u.role = 'admin', u.password = $password",
+            email=ADMIN_EMAIL,
+            password=hashed,
+        )
+        await result.consume()
+        return "password reset"
+
+    if record["role"] != "admin":
+        result = await session.run("MATCH (u:User {email: $email}) SET u.role = 'admin'", email=ADMIN_EMAIL)
+        await result.consume()
+        return "promoted"
+    return "unchanged"
+
+
+async def _seed_default_services(session) -> int:
+    result = await session.run(
+        "OPTIONAL MATCH (existing:Service) "
+        "WITH count(existing) AS existing WHERE existing = 0 "
+        "UNWIND $services AS svc "
+        "CREATE (s:Service {id: svc.id, name: svc.name, requirements: svc.requirements}) "
+        "RETURN count(s) AS created",
+        services=_DEFAULT_SERVICES,
+    )
+    record = await result.single()
+    return record["created"] if record is not None else 0
+
+
+_SCHEMA_CONSTRAINTS = [
+    ("user_email_unique", "CREATE CONSTRAINT user_email_unique IF NOT EXISTS FOR (u:User) REQUIRE u.email IS UNIQUE"),
+    ("user_id_unique", "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE"),
+    ("appointment_id_unique", "CREATE CONSTRAINT appointment_id_unique IF NOT EXISTS FOR (a:Appointment) REQUIRE a.id IS UNIQUE"),
+    ("service_id_unique", "CREATE CONSTRAINT service_id_unique IF NOT EXISTS FOR (s:Service) REQUIRE s.id IS UNIQUE"),
+    ("availability_id_unique", "CREATE CONSTRAINT availability_id_unique IF NOT EXISTS FOR (a:Availability) REQUIRE a.id IS UNIQUE"),
+    (
+        "availability_slot_unique",
+        "CREATE CONSTRAINT availability_slot_unique IF NOT EXISTS FOR (a:Availability) REQUIRE (a.date, a.time) IS UNIQUE",
+    ),
+    ("queue_day_date_unique", "CREATE CONSTRAINT queue_day_date_unique IF NOT EXISTS FOR (d:QueueDay) REQUIRE d.date IS UNIQUE"),
+    ("revoked_token_jti_unique", "CREATE CONSTRAINT revoked_token_jti_unique IF NOT EXISTS FOR (r:RevokedToken) REQUIRE r.jti IS UNIQUE"),
+    (
+        "service_timing_unique",
+        "CREATE CONSTRAINT service_timing_unique IF NOT EXISTS FOR (t:ServiceTiming) REQUIRE t.service IS UNIQUE",
+    ),
+]
+
+_SCHEMA_INDEXES = [
+    ("appointment_status_date", "CREATE INDEX appointment_status_date IF NOT EXISTS FOR (a:Appointment) ON (a.status, a.date)"),
+    ("appointment_date_time", "CREATE INDEX appointment_date_time IF NOT EXISTS FOR (a:Appointment) ON (a.date, a.time)"),
+    ("archived_appointment_id", "CREATE INDEX archived_appointment_id IF NOT EXISTS FOR (a:ArchivedAppointment) ON (a.id)"),
+    (
+        "archived_appointment_date_time",
+        "CREATE INDEX archived_appointment_date_time IF NOT EXISTS FOR (a:ArchivedAppointment) ON (a.date, a.time)",
+    ),
+    ("service_name", "CREATE INDEX service_name IF NOT EXISTS FOR (s:Service) ON (s.name)"),
+]
+
+
+async def _ensure_schema(session) -> Dict[str, Any]:
+    errors: Dict[str, str] = {}
+    for name, statement in _SCHEMA_CONSTRAINTS + _SCHEMA_INDEXES:
+        try:
+            result = await session.run(statement)
+            await result.consume()
+        except Exception as e:
+            errors[name] = str(e)
+    report = await _schema_report(session)
+    report["errors"] = errors
+    return report
+
+
+async def _schema_report(session) -> Dict[str, Any]:
+    result = await session.run("SHOW CONSTRAINTS YIELD name")
+    constraints = {r["name"] async for r in result}
+    result = await session.run("SHOW INDEXES YIELD name, state")
+    indexes = {r["name"]: r["state"] async for r in result}
+    return {
+        "constraints": {name: name in constraints for name, _ in _SCHEMA_CONSTRAINTS},
+        "indexes": {name: indexes.get(name) for name, _ in _SCHEMA_INDEXES},
+    }
+
+
+async def _bootstrap(session, reset_admin_password: bool = False) -> Dict[str, Any]:
+    schema = await _ensure_schema(session)
+    services_created = await _seed_default_services(session)
+    admin = await _initialize_admin(session, reset_admin_password)
+    _emit("profiles")
+    slots_recounted = await _recount_slot_bookings(session)
+    return {"schema": schema, "servicesCreated": services_created, "admin": admin, "slotsRecounted": slots_recounted}
+
+
+async def _verify_bootstrap(session) -> List[str]:
+    result = await session.run(
+        "OPTIONAL MATCH (s:Service) WITH count(s) AS services "
+        "OPTIONAL MATCH (u:User {email: $email, role: 'admin'}) "
+        "RETURN services, count(u) AS admins",
+        email=ADMIN_EMAIL,
+    )
+    record = await result.single()
+    problems = []
+    if record["services"] == 0:
+        problems.append("no services exist")
+    if record["admins"] == 0:
+        problems.append(f"admin account {ADMIN_EMAIL} is missing")
+    return problems
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
+    global _archive_task
+    started = perf_counter()
     try:
-        driver = _get_driver()
-        driver.verify_connectivity()
-        await _initialize_admin()
+        await _event_bus.start(_deliver_event)
+    except Exception as e:
+        print(f"Event bus ({_event_bus.name}) startup warning: {e}")
+    try:
+        driver = await _get_driver()
+        if NEO4J_WARM_CONNECTIONS > 0:
+            warmed = await _warm_pool(driver, NEO4J_WARM_CONNECTIONS)
+            print(f"Neo4j pool warmed with {warmed}/{NEO4J_WARM_CONNECTIONS} connections")
+        async with driver.session() as session:
+            if STARTUP_BOOTSTRAP == "apply":
+                report = await _bootstrap(session)
+                for name, error in report["schema"]["errors"].items():
+                    print(f"Neo4j schema warning: {name}: {error}")
+            elif STARTUP_BOOTSTRAP == "verify":
+                for problem in await _verify_bootstrap(session):
+                    print(f"Neo4j bootstrap warning: {problem}; run `python main.py bootstrap`")
+            await _load_revoked_tokens(session)
     except Exception as e:
         print(f"Neo4j startup warning: {e}")
+    if ARCHIVE_INTERVAL > 0:
+        _archive_task = asyncio.ensure_future(_archive_loop())
+    print(f"Startup ({STARTUP_BOOTSTRAP}) finished in {perf_counter() - started:.3f}s")
 
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
-    global _driver
+    global _driver, _password_executor, _archive_task
+    if _archive_task is not None:
+        _archive_task.cancel()
+        _archive_task = None
+    await _event_bus.stop()
     if _driver is not None:
-        _driver.close()
+        await _driver.close()
         _driver = None
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False)
+        _password_executor = None
 
 
 @app.get("/api/health")
@@ -374,168 +1799,609 @@ async def health() -> Dict[str, Any]:
 
 @app.post("/api/auth/signup")
 async def signup(payload: SignupRequest) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        existing = session.run("MATCH (u:User {email: $email}) RETURN u", email=str(payload.email))
-        if existing.peek() is not None:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        existing = await session.run("MATCH (u:User {email: $email}) RETURN u", email=str(payload.email))
+        if (await existing.peek()) is not None:
             raise HTTPException(status_code=400, detail="User already exists")
 
-        hashed = _hash_password(payload.password)
-        result = session.run(
-            "CREATE (u:User {id: randomUUID(), name: $name, email: $email, password: $password, role: 'client', createdAt: datetime()}) RETURN u",
-            name=payload.name,
-            email=str(payload.email),
-            password=hashed,
-        )
-        user_node = result.single()["u"]
-        user = _node_to_dict(user_node)
-        user.pop("password", None)
+        hashed = await _hash_password_async(payload.password)
+        try:
+            result = await session.run(
+                "CREATE (u:User {id: randomUUID(), name: $name, email: $email, password: $password, role: 'client', createdAt: datetime()}) RETURN u",
+                name=payload.name,
+                email=str(payload.email),
+                password=hashed,
+            )
+            user_node = (await result.single())["u"]
+        except ConstraintError:
+            raise HTTPException(status_code=400, detail="User already exists")
+        user = _user_to_dict(user_node)
         token = _create_token(user_id=user["id"], email=user["email"], role=user.get("role", "client"))
         return {"token": token, "user": user}
 
 
 @app.post("/api/auth/login")
 async def login(payload: LoginRequest) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (u:User {email: $email}) RETURN u", email=str(payload.email))
-        record = result.single()
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (u:User {email: $email}) RETURN u", email=str(payload.email))
+        record = await result.single()
         if record is None:
             raise HTTPException(status_code=400, detail="Invalid credentials")
 
         user_node = record["u"]
-        user_props = _node_to_dict(user_node)
-        if not _verify_password(payload.password, user_props.get("password", "")):
+        user_props = dict(user_node)
+        if not await _verify_password_async(payload.password, user_props.get("password", "")):
             raise HTTPException(status_code=400, detail="Invalid credentials")
 
-        user = _node_props_to_dict(user_props)
-        user.pop("password", None)
+        user = _user_to_dict(user_props)
         token = _create_token(user_id=user["id"], email=user["email"], role=user.get("role", "client"))
         return {"token": token, "user": user}
 
 
 @app.post("/api/admin/login")
 async def admin_login(payload: AdminLoginRequest) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (u:User {email: $email}) RETURN u", email=str(payload.email))
-        record = result.single()
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (u:User {email: $email}) RETURN u", email=str(payload.email))
+        record = await result.single()
         if record is None:
             raise HTTPException(status_code=400, detail="Invalid credentials")
 
         user_node = record["u"]
-        user_props = _node_to_dict(user_node)
-        if not _verify_password(payload.password, user_props.get("password", "")):
+        user_props = dict(user_node)
+        if not await _verify_password_async(payload.password, user_props.get("password", "")):
             raise HTTPException(status_code=400, detail="Invalid credentials")
 
-        user = _node_props_to_dict(user_props)
+        user = _user_to_dict(user_props)
         if user.get("role") != "admin":
             raise HTTPException(status_code=403, detail="Access denied. Admin only.")
 
-        user.pop("password", None)
         token = _create_token(user_id=user["id"], email=user["email"], role="admin")
         return {"token": token, "user": user}
 
 
-@app.get("/api/auth/me")
-async def me(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (u:User {id: $id}) RETURN u", id=user.get("userId"))
-        record = result.single()
+async def _load_profile(user_id: Optional[str]) -> Dict[str, Any]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (u:User {id: $id}) RETURN u", id=user_id)
+        record = await result.single()
         if record is None:
             raise HTTPException(status_code=404, detail="User not found")
-        u = _node_to_dict(record["u"])
-        u.pop("password", None)
-        return {"user": u}
+        return _user_to_dict(record["u"])
+
+
+@app.get("/api/auth/me")
+async def me(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    user_id = user.get("userId")
+    u = await _profile_cache.get_or_load(user_id, lambda: _load_profile(user_id))
+    return {"user": u}
+
+
+@app.post("/api/auth/logout")
+async def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    user: Dict[str, Any] = Depends(get_current_user),
+) -> Dict[str, Any]:
+    _token_cache.pop(credentials.credentials, None)
+    jti = user.get("jti")
+    if jti:
+        driver = await _get_driver()
+        async with driver.session() as session:
+            result = await session.run(
+                "MERGE (r:RevokedToken {jti: $jti}) SET r.expiresAt = $expiresAt, r.revokedAt = datetime()",
+                jti=jti,
+                expiresAt=user.get("exp"),
+            )
+            await result.consume()
+        _emit("revoke", {"jti": jti, "exp": user.get("exp")})
+    return {"message": "Logged out"}
+
+
+async def _load_services() -> List[Dict[str, Any]]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (s:Service) RETURN s {.*} AS s ORDER BY s.name")
+        return [_service_to_dict(r["s"]) async for r in result]
+
+
+def _availability_to_dict(node: Any) -> Dict[str, Any]:
+    availability = _availability_props(node)
+    slots = availability.get("slots") or 0
+    availability["remaining"] = max(0, slots - (availability.get("booked") or 0))
+    return availability
+
+
+async def _load_availability(date_from: Optional[str], date_to: Optional[str], open_only: bool) -> List[Dict[str, Any]]:
+    clauses = []
+    if date_from:
+        clauses.append("a.date >= $dateFrom")
+    if date_to:
+        clauses.append("a.date <= $dateTo")
+    if open_only:
+        clauses.append("coalesce(a.booked, 0) < a.slots")
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run(
+            f"MATCH (a:Availability) {where}RETURN a {{.*}} AS a ORDER BY a.date, a.time",
+            dateFrom=date_from,
+            dateTo=date_to,
+        )
+        return [_availability_to_dict(r["a"]) async for r in result]
 
 
 @app.get("/api/services")
-async def get_services() -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        services = _ensure_default_services(session)
-        return {"services": services}
+async def get_services(request: Request, response: Response) -> Any:
+    services, etag = await _catalog_cache.get_or_load("services", lambda: _tagged("catalog", _load_services))
+    not_modified = _conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    return {"services": services}
 
 
 @app.get("/api/services/{service_id}")
-async def get_service(service_id: str) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (s:Service {id: $id}) RETURN s", id=service_id)
-        record = result.single()
-        if record is None:
-            raise HTTPException(status_code=404, detail="Service not found")
-        service = _node_to_dict(record["s"])
-        return {"service": service}
+async def get_service(service_id: str, request: Request, response: Response) -> Any:
+    services, _ = await _catalog_cache.get_or_load("services", lambda: _tagged("catalog", _load_services))
+    service = next((s for s in services if s.get("id") == service_id), None)
+    if service is None:
+        driver = await _get_driver()
+        async with driver.session() as session:
+            result = await session.run("MATCH (s:Service {id: $id}) RETURN s", id=service_id)
+            record = await result.single()
+            if record is None:
+                raise HTTPException(status_code=404, detail="Service not found")
+            service = _service_to_dict(record["s"])
+    not_modified = _conditional(request, response, _content_etag("service", service))
+    if not_modified is not None:
+        return not_modified
+    return {"service": service}
 
 
 @app.get("/api/availability")
-async def get_availability() -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (a:Availability) RETURN a ORDER BY a.date, a.time")
-        availabilities = [_node_to_dict(r["a"]) for r in result]
-        return {"availabilities": availabilities}
+async def get_availability(
+    request: Request,
+    response: Response,
+    date_from: Optional[str] = Query(None, alias="dateFrom"),
+    date_to: Optional[str] = Query(None, alias="dateTo"),
+    open_only: bool = Query(False, alias="openOnly"),
+) -> Any:
+    availabilities, etag = await _availability_cache.get_or_load(
+        (date_from, date_to, open_only),
+        lambda: _tagged("availability", lambda: _load_availability(date_from, date_to, open_only)),
+    )
+    not_modified = _conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    return {"availabilities": availabilities}
 
 
-@app.post("/api/appointments")
-async def create_appointment(payload: AppointmentCreate, user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
+_ACTIVE_STATUSES = ("pending", "approved")
+_SEATED_STATUSES = _ACTIVE_STATUSES + ("served",)
+_FINAL_STATUSES = ("served", "declined", "cancelled")
+
+
+def _ensure_not_served(state: Dict[str, Any]) -> None:
+    if state["status"] == "served":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Appointment has already been served")
+
+
+async def _reserve_slot(tx, appt_date: Optional[str], appt_time: Optional[str]) -> None:
+    # The increment reads booked under the node's write lock, so concurrent bookings
+    # for the same slot serialize here and the capacity check below sees every seat.
+    result = await tx.run(
+        "MATCH (av:Availability {date: $date, time: $time}) "
+        "SET av.booked = coalesce(av.booked, 0) + 1 "
+        "RETURN av.booked AS booked, av.slots AS slots",
+        date=appt_date,
+        time=appt_time,
+    )
+    record = await result.single()
+    if record is not None and record["slots"] is not None and record["booked"] > record["slots"]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Selected time slot is fully booked")
+
+
+async def _release_slot(tx, appt_date: Optional[str], appt_time: Optional[str]) -> None:
+    result = await tx.run(
+        "MATCH (av:Availability {date: $date, time: $time}) "
+        "SET av.booked = CASE WHEN coalesce(av.booked, 0) > 0 THEN av.booked - 1 ELSE 0 END",
+        date=appt_date,
+        time=appt_time,
+    )
+    await result.consume()
+
+
+async def _recount_slot_bookings(session) -> int:
+    result = await session.run(
+        "MATCH (av:Availability) "
+        "OPTIONAL MATCH (a:Appointment) "
+        "WHERE a.date = av.date AND a.time = av.time AND a.status IN $statuses "
+        "WITH av, count(a) AS live "
+        "OPTIONAL MATCH (h:ArchivedAppointment) "
+        "WHERE h.date = av.date AND h.time = av.time AND h.status = 'served' "
+        "WITH av, live + count(h) AS booked "
+        "SET av.booked = booked "
+        "RETURN count(av) AS slots",
+        statuses=list(_SEATED_STATUSES),
+    )
+    return (await result.single())["slots"]
+
+
+async def _lock_active_booking(
+    tx, user_id: Optional[str], service: str, appt_date: str, exclude_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    # Write-locks the user before looking for their active booking of this service and
+    # date, so concurrent retries see each other's appointment instead of racing. The
+    # property is set and removed in the same statement: only the lock is kept.
+    # Lock order: QueueDay -> User -> Availability.
+    result = await tx.run(
+        "MATCH (u:User {id: $userId}) SET u._bookingLock = true REMOVE u._bookingLock "
+        "WITH u OPTIONAL MATCH (u)-[:HAS_APPOINTMENT]->(a:Appointment {service: $service, date: $date}) "
+        "WHERE a.status IN $statuses AND ($excludeId IS NULL OR a.id <> $excludeId) "
+        "RETURN a LIMIT 1",
+        userId=user_id,
+        service=service,
+        date=appt_date,
+        statuses=list(_ACTIVE_STATUSES),
+        excludeId=exclude_id,
+    )
+    record = await result.single()
+    if record is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return _appointment_to_dict(record["a"]) if record["a"] is not None else None
+
+
+def _duplicate_booking(service: str, appt_date: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"You already have an active {service} appointment on {appt_date}",
+    )
+
+
+async def _book_appointment(payload: AppointmentCreate, user_id: Optional[str]) -> Dict[str, Any]:
+    async def _create(tx) -> Tuple[Dict[str, Any], bool]:
+        existing = await _lock_active_booking(tx, user_id, payload.service, payload.date)
+        if existing is not None:
+            # A retried booking for the same slot collapses into the one already made.
+            if existing.get("time") == payload.time:
+                return existing, False
+            raise _duplicate_booking(payload.service, payload.date)
+        await _reserve_slot(tx, payload.date, payload.time)
+        result = await tx.run(
             "MATCH (u:User {id: $userId}) "
             "CREATE (a:Appointment {id: randomUUID(), name: $name, email: $email, service: $service, date: $date, time: $time, status: 'pending', createdAt: datetime()}) "
             "CREATE (u)-[:HAS_APPOINTMENT]->(a) "
             "RETURN a",
-            userId=user.get("userId"),
+            userId=user_id,
             name=payload.name,
             email=str(payload.email),
             service=payload.service,
             date=payload.date,
             time=payload.time,
         )
-        appointment = _node_to_dict(result.single()["a"])
+        record = await result.single()
+        if record is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return _appointment_to_dict(record["a"]), True
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        appointment, created = await session.execute_write(_create)
+        if created:
+            _queue_changed(appointment.get("id"), user_id=user_id)
+            _availability_changed()
         return {"appointment": appointment}
 
 
+@app.post("/api/appointments")
+async def create_appointment(
+    payload: AppointmentCreate,
+    request: Request,
+    response: Response,
+    user: Dict[str, Any] = Depends(get_current_user),
+) -> Dict[str, Any]:
+    key = request.headers.get("idempotency-key")
+    if not key:
+        return await _book_appointment(payload, user.get("userId"))
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
+    # Concurrent requests with the same key share one in-flight booking; only
+    # successful responses are kept, so a failed attempt can be retried.
+    fingerprint = json.dumps(payload.model_dump(mode="json"), sort_keys=True)
+    first = []
+
+    async def _load() -> Tuple[str, Dict[str, Any]]:
+        first.append(True)
+        return fingerprint, await _book_appointment(payload, user.get("userId"))
+
+    stored, body = await _idempotency_cache.get_or_load((user.get("userId"), key), _load)
+    if stored != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if not first:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+
 @app.get("/api/appointments/my-appointments")
 async def my_appointments(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
-            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment) RETURN a ORDER BY a.createdAt DESC",
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run(
+            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a) WHERE a:Appointment OR a:ArchivedAppointment "
+            "RETURN a {.*} AS a ORDER BY a.createdAt DESC",
             userId=user.get("userId"),
         )
-        appointments = [_node_to_dict(r["a"]) for r in result]
+        appointments = [_appointment_to_dict(r["a"]) async for r in result]
         return {"appointments": appointments}
 
 
 @app.get("/api/appointments/{appointment_id}")
 async def get_appointment(appointment_id: str, user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
-            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment {id: $id}) RETURN a",
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run(
+            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a {id: $id}) "
+            "WHERE a:Appointment OR a:ArchivedAppointment RETURN a",
             userId=user.get("userId"),
             id=appointment_id,
         )
-        record = result.single()
+        record = await result.single()
         if record is None:
             raise HTTPException(status_code=404, detail="Appointment not found")
-        appointment = _node_to_dict(record["a"])
+        appointment = _appointment_to_dict(record["a"])
         return {"appointment": appointment}
 
 
+async def _lock_queue_date(tx, appt_date: str) -> None:
+    result = await tx.run(
+        "MERGE (d:QueueDay {date: $date}) SET d.lockedAt = datetime()",
+        date=appt_date,
+    )
+    await result.consume()
+
+
+async def _read_queue_state(tx, appointment_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    if user_id is None:
+        match = "MATCH (a:Appointment {id: $id}) "
+    else:
+        match = "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment {id: $id}) "
+    result = await tx.run(
+        match + "RETURN a.status AS status, a.date AS date, a.time AS time, a.queueNumber AS queueNumber",
+        id=appointment_id,
+        userId=user_id,
+    )
+    record = await result.single()
+    return dict(record) if record is not None else None
+
+
+async def _lock_appointment_queue(tx, appointment_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    # Queue numbers are only trustworthy once the day lock is held, so the state is
+    # re-read after locking until the locked date is still the appointment's date.
+    state = await _read_queue_state(tx, appointment_id, user_id)
+    locked: set = set()
+    while state is not None and state["date"] and state["date"] not in locked:
+        await _lock_queue_date(tx, state["date"])
+        locked.add(state["date"])
+        state = await _read_queue_state(tx, appointment_id, user_id)
+    return state
+
+
+async def _queue_remove(tx, appointment_id: str, appt_date: str, queue_number: Optional[int]) -> None:
+    if queue_number is None:
+        return
+    result = await tx.run(
+        "MATCH (t:Appointment) "
+        "WHERE t.status = 'approved' AND t.date = $date AND t.id <> $id AND t.queueNumber > $queueNumber "
+        "SET t.queueNumber = t.queueNumber - 1",
+        id=appointment_id,
+        date=appt_date,
+        queueNumber=queue_number,
+    )
+    await result.consume()
+
+
+async def _queue_insert(tx, appointment_id: str, appt_date: str) -> int:
+    result = await tx.run(
+        "MATCH (a:Appointment {id: $id}) "
+        "OPTIONAL MATCH (o:Appointment) "
+        "WHERE o.status = 'approved' AND o.date = $date AND o.id <> a.id "
+        "AND (o.time < a.time OR (o.time = a.time AND o.createdAt < a.createdAt)) "
+        "RETURN count(o) + 1 AS position",
+        id=appointment_id,
+        date=appt_date,
+    )
+    position = (await result.single())["position"]
+    result = await tx.run(
+        "OPTIONAL MATCH (t:Appointment) "
+        "WHERE t.status = 'approved' AND t.date = $date AND t.id <> $id AND t.queueNumber >= $position "
+        "SET t.queueNumber = t.queueNumber + 1 "
+        "WITH count(t) AS shifted "
+        "MATCH (a:Appointment {id: $id}) "
+        "SET a.queueNumber = $position",
+        id=appointment_id,
+        date=appt_date,
+        position=position,
+    )
+    await result.consume()
+    return position
+
+
+async def _renumber_approved_queue_for_date(tx, appt_date: str) -> None:
+    await _lock_queue_date(tx, appt_date)
+    result = await tx.run(
+        "MATCH (a:Appointment) "
+        "WHERE a.status = 'approved' AND a.date = $date "
+        "WITH a ORDER BY a.time ASC, a.createdAt ASC "
+        "WITH collect(a) AS queue "
+        "UNWIND range(0, size(queue) - 1) AS idx "
+        "WITH queue[idx] AS a, idx "
+        "SET a.queueNumber = idx + 1",
+        date=appt_date,
+    )
+    await result.consume()
+
+
+async def _check_queue_for_date(tx, appt_date: str) -> Dict[str, Any]:
+    result = await tx.run(
+        "MATCH (a:Appointment) "
+        "WHERE a.status = 'approved' AND a.date = $date "
+        "RETURN a.id AS id, a.queueNumber AS queueNumber "
+        "ORDER BY a.time ASC, a.createdAt ASC",
+        date=appt_date,
+    )
+    mismatches = []
+    expected = 0
+    async for r in result:
+        expected += 1
+        if r["queueNumber"] != expected:
+            mismatches.append({"id": r["id"], "expected": expected, "actual": r["queueNumber"]})
+    return {"date": appt_date, "approved": expected, "consistent": not mismatches, "mismatches": mismatches}
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    pos = (len(ordered) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def _timing_stats(samples: List[float]) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    stats: Dict[str, Any] = {"samples": len(ordered), "expectedSeconds": ETA_DEFAULT_MINUTES * 60}
+    if ordered:
+        stats["meanSeconds"] = round(sum(ordered) / len(ordered), 1)
+        stats["p50Seconds"] = round(_quantile(ordered, 0.5), 1)
+        stats["p90Seconds"] = round(_quantile(ordered, 0.9), 1)
+    if len(ordered) >= ETA_MIN_SAMPLES:
+        stats["expectedSeconds"] = round(_quantile(ordered, ETA_QUANTILE), 1)
+    return stats
+
+
+async def _load_service_timings() -> Dict[str, Dict[str, Any]]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (t:ServiceTiming) RETURN t.service AS service, t.samples AS samples")
+        return {r["service"]: _timing_stats(r["samples"] or []) async for r in result}
+
+
+def _handling_seconds(served_at: datetime, *starts: Any) -> Optional[float]:
+    # A counter serves one person at a time, so handling time is the gap since the
+    # previous person on that date was served or since approval, whichever is later.
+    # Gaps longer than ETA_MAX_SAMPLE_MINUTES are breaks or stale approvals.
+    known = [v.to_native() if hasattr(v, "to_native") else v for v in starts if v is not None]
+    if not known:
+        return None
+    seconds = (served_at - max(known)).total_seconds()
+    if seconds <= 0 or seconds > ETA_MAX_SAMPLE_MINUTES * 60:
+        return None
+    return round(seconds, 1)
+
+
+async def _record_service_time(tx, service: Optional[str], seconds: float) -> None:
+    result = await tx.run(
+        "MERGE (t:ServiceTiming {service: $service}) "
+        "SET t.samples = (coalesce(t.samples, []) + $seconds)[-$window..], t.updatedAt = datetime()",
+        service=service or "",
+        seconds=seconds,
+        window=ETA_WINDOW,
+    )
+    await result.consume()
+
+
+_OFFICE_TZ = ZoneInfo(APP_TIMEZONE) if APP_TIMEZONE else None
+
+
+def _office_now() -> datetime:
+    # Slot dates and times are the office's wall clock, which need not be the
+    # server's (hosted workers usually run in UTC). Without APP_TIMEZONE the
+    # server's local time is used.
+    return datetime.now(_OFFICE_TZ)
+
+
+def _slot_start(appt_date: Optional[str], appt_time: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.strptime(f"{appt_date} {appt_time or '00:00'}", "%Y-%m-%d %H:%M").replace(tzinfo=_OFFICE_TZ)
+    except ValueError:
+        return None
+
+
+def _estimate_queue(
+    appt_date: str,
+    queue: List[Dict[str, Any]],
+    timings: Dict[str, Dict[str, Any]],
+    now: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    # One pass over the queue: each person starts when the one ahead is expected to
+    # finish, but never before their booked slot or before now.
+    clock = max(now, _slot_start(appt_date, None) or now)
+    etas: Dict[str, Dict[str, Any]] = {}
+    for position, appointment in enumerate(queue, 1):
+        start = max(clock, _slot_start(appt_date, appointment["time"]) or clock)
+        etas[appointment["id"]] = {
+            "position": position,
+            "estimatedTime": start.strftime("%H:%M"),
+            "estimatedStart": start.isoformat(timespec="minutes"),
+            "waitMinutes": max(0, round((start - now).total_seconds() / 60)),
+        }
+        expected = timings.get(appointment["service"] or "", {}).get("expectedSeconds", ETA_DEFAULT_MINUTES * 60)
+        clock = start + timedelta(seconds=expected)
+    return etas
+
+
+async def _load_queue_etas(appt_date: str) -> Dict[str, Dict[str, Any]]:
+    timings = await _timing_cache.get_or_load("services", _load_service_timings)
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run(
+            "MATCH (a:Appointment) WHERE a.status = 'approved' AND a.date = $date "
+            "RETURN a.id AS id, a.service AS service, a.time AS time ORDER BY a.queueNumber",
+            date=appt_date,
+        )
+        queue = [dict(r) async for r in result]
+    return _estimate_queue(appt_date, queue, timings, _office_now())
+
+
+async def _queue_etas(appt_date: str) -> Dict[str, Dict[str, Any]]:
+    return await _eta_cache.get_or_load(appt_date, lambda: _load_queue_etas(appt_date))
+
+
+async def _attach_eta(appointment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # An estimatedTime typed by the admin wins; otherwise the live estimate fills it in.
+    if appointment.get("status") != "approved" or not appointment.get("date"):
+        return None
+    eta = (await _queue_etas(appointment["date"])).get(appointment.get("id"))
+    if eta is not None and not appointment.get("estimatedTime"):
+        appointment["estimatedTime"] = eta["estimatedTime"]
+    return eta
+
+
 @app.put("/api/appointments/{appointment_id}")
 async def update_appointment(appointment_id: str, payload: AppointmentUpdate, user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
-            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment {id: $id}) "
+    async def _update(tx) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        state = await _lock_appointment_queue(tx, appointment_id, user.get("userId"))
+        if state is None:
+            return None
+        _ensure_not_served(state)
+
+        moved = (state["date"], state["time"]) != (payload.date, payload.time)
+        requeue = state["status"] == "approved" and moved
+        if requeue:
+            await _lock_queue_date(tx, payload.date)
+        if state["status"] in _ACTIVE_STATUSES:
+            if await _lock_active_booking(tx, user.get("userId"), payload.service, payload.date, appointment_id) is not None:
+                raise _duplicate_booking(payload.service, payload.date)
+        if moved and state["status"] in _ACTIVE_STATUSES:
+            await _reserve_slot(tx, payload.date, payload.time)
+            await _release_slot(tx, state["date"], state["time"])
+        if requeue and state["date"]:
+            await _queue_remove(tx, appointment_id, state["date"], state["queueNumber"])
+
+        result = await tx.run(
+            "MATCH (a:Appointment {id: $id}) "
             "SET a.name = $name, a.email = $email, a.service = $service, a.date = $date, a.time = $time, a.updatedAt = datetime() "
             "RETURN a",
-            userId=user.get("userId"),
             id=appointment_id,
             name=payload.name,
             email=str(payload.email),
@@ -543,95 +2409,337 @@ async def update_appointment(appointment_id: str, payload: AppointmentUpdate, us
             date=payload.date,
             time=payload.time,
         )
-        record = result.single()
-        if record is None:
+        record = await result.single()
+        if not requeue:
+            return _appointment_to_dict(record["a"]), state
+
+        await _queue_insert(tx, appointment_id, payload.date)
+        refreshed = await tx.run("MATCH (a:Appointment {id: $id}) RETURN a", id=appointment_id)
+        return _appointment_to_dict((await refreshed.single())["a"]), state
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        updated = await session.execute_write(_update)
+        if updated is None:
             raise HTTPException(status_code=404, detail="Appointment not found")
-        appointment = _node_to_dict(record["a"])
+        appointment, previous = updated
+        _queue_changed(appointment_id, (previous["date"], appointment.get("date")))
+        _availability_changed()
         return {"appointment": appointment}
 
 
-def _renumber_approved_queue_for_date(session, appt_date: str) -> None:
-    result = session.run(
-        "MATCH (a:Appointment) "
-        "WHERE a.status = 'approved' AND a.date = $date "
-        "RETURN a ORDER BY a.time ASC, a.createdAt ASC",
-        date=appt_date,
-    )
-    appointments = [dict(r["a"]).get("id") for r in result]
-    for idx, appointment_id in enumerate(appointments, start=1):
-        if not appointment_id:
-            continue
-        session.run(
-            "MATCH (a:Appointment {id: $id}) SET a.queueNumber = $n",
-            id=appointment_id,
-            n=idx,
-        )
-
-
 @app.delete("/api/appointments/{appointment_id}")
 async def cancel_appointment(appointment_id: str, user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        date_record = session.run(
-            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment {id: $id}) RETURN a.date as date",
-            userId=user.get("userId"),
-            id=appointment_id,
-        ).single()
-        if date_record is None:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        appt_date = date_record["date"]
-
-        result = session.run(
-            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment {id: $id}) "
-            "SET a.status = 'cancelled', a.cancelledAt = datetime() "
-            "RETURN a",
-            userId=user.get("userId"),
+    async def _cancel(tx) -> Optional[Dict[str, Any]]:
+        state = await _lock_appointment_queue(tx, appointment_id, user.get("userId"))
+        if state is None:
+            return None
+        _ensure_not_served(state)
+        if state["status"] == "approved" and state["date"]:
+            await _queue_remove(tx, appointment_id, state["date"], state["queueNumber"])
+        if state["status"] in _ACTIVE_STATUSES:
+            await _release_slot(tx, state["date"], state["time"])
+        result = await tx.run(
+            "MATCH (a:Appointment {id: $id}) SET a.status = 'cancelled', a.cancelledAt = datetime()",
             id=appointment_id,
         )
-        record = result.single()
-        if record is None:
+        await result.consume()
+        return state
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        state = await session.execute_write(_cancel)
+        if state is None:
             raise HTTPException(status_code=404, detail="Appointment not found")
-        _renumber_approved_queue_for_date(session, appt_date)
+        _queue_changed(appointment_id, (state["date"],))
+        _availability_changed()
         return {"message": "Appointment cancelled successfully"}
 
 
+async def _current_queue_snapshot(session, user_id: Optional[str]) -> Dict[str, Any]:
+    result = await session.run(
+        "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment) "
+        "WHERE a.status IN ['pending','approved'] "
+        "RETURN a ORDER BY a.createdAt DESC LIMIT 1",
+        userId=user_id,
+    )
+    record = await result.single()
+    if record is None:
+        return {"queueNumber": None, "message": "No active appointments"}
+    appointment = _appointment_to_dict(record["a"])
+    eta = await _attach_eta(appointment)
+    return {"queueNumber": appointment.get("queueNumber"), "appointment": appointment, "eta": eta}
+
+
 @app.get("/api/queue/current")
-async def queue_current(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
-            "MATCH (u:User {id: $userId})-[:HAS_APPOINTMENT]->(a:Appointment) "
-            "WHERE a.status IN ['pending','approved'] "
-            "RETURN a ORDER BY a.createdAt DESC LIMIT 1",
-            userId=user.get("userId"),
-        )
-        record = result.single()
-        if record is None:
-            return {"queueNumber": None, "message": "No active appointments"}
-        appointment = _node_to_dict(record["a"])
-        return {"queueNumber": appointment.get("queueNumber"), "appointment": appointment}
+async def queue_current(request: Request, response: Response, user: Dict[str, Any] = Depends(get_current_user)) -> Any:
+    # Snapshots are cached per user for ETA_CACHE_TTL, the same lifetime as the ETAs
+    # they carry, and dropped on every queue or timing change.
+    user_id = user.get("userId")
+    snapshot, etag = await _queue_cache.get_or_load(user_id, lambda: _tagged("queue", lambda: _load_queue_snapshot(user_id)))
+    not_modified = _conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    return snapshot
+
+
+async def _load_queue_snapshot(user_id: Optional[str]) -> Dict[str, Any]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        return await _current_queue_snapshot(session, user_id)
+
+
+async def _authenticate_websocket(websocket: WebSocket) -> Optional[str]:
+    # The token comes in the first message, {"type": "auth", "token": ...}, rather than
+    # the URL, so it stays out of proxy and access logs.
+    try:
+        message = await asyncio.wait_for(websocket.receive_json(), QUEUE_WS_AUTH_TIMEOUT)
+        if not isinstance(message, dict) or message.get("type") != "auth":
+            return None
+        return _verify_token(str(message.get("token") or "")).get("userId")
+    except (asyncio.TimeoutError, JWTError, ValueError, KeyError):
+        return None
+
+
+@app.websocket("/api/queue/ws")
+async def queue_updates(websocket: WebSocket) -> None:
+    await websocket.accept()
+    try:
+        user_id = await _authenticate_websocket(websocket)
+    except (WebSocketDisconnect, RuntimeError):
+        return
+    if not user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    queue = _queue_hub.subscribe(user_id)
+    receiver = asyncio.ensure_future(_drain_websocket(websocket))
+    try:
+        driver = await _get_driver()
+        async with driver.session() as session:
+            snapshot = await _current_queue_snapshot(session, user_id)
+        await websocket.send_json({"type": "snapshot", **snapshot})
+
+        while not receiver.done():
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, timeout=QUEUE_WS_PING_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await websocket.send_json(getter.result())
+            else:
+                getter.cancel()
+                if not receiver.done():
+                    await websocket.send_json({"type": "ping"})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason=str(e.detail)[:120])
+    finally:
+        receiver.cancel()
+        _queue_hub.unsubscribe(user_id, queue)
+
+
+async def _drain_websocket(websocket: WebSocket) -> None:
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+_APPOINTMENT_PAGE_KEYS = [
+    ("a.date", "a.date", "$c0"),
+    ("a.time", "a.time", "$c1"),
+    ("a.createdAt", "toString(a.createdAt)", "datetime($c2)"),
+    ("a.id", "a.id", "$c3"),
+]
+
+_QUEUE_PAGE_KEYS = [
+    ("a.date", "a.date", "$c0"),
+    ("a.queueNumber", "a.queueNumber", "$c1"),
+    ("a.id", "a.id", "$c2"),
+]
+
+
+def _encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _keyset_condition(keys: List[Tuple[str, str, str]], idx: int = 0) -> str:
+    expr, _, param = keys[idx]
+    if idx == len(keys) - 1:
+        return f"{expr} > {param}"
+    return f"({expr} > {param} OR ({expr} = {param} AND {_keyset_condition(keys, idx + 1)}))"
+
+
+def _appointment_filters(
+    statuses: Optional[str],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    service: Optional[str],
+) -> Tuple[List[str], Dict[str, Any]]:
+    clauses: List[str] = []
+    params: Dict[str, Any] = {}
+    if statuses:
+        clauses.append("a.status IN $statuses")
+        params["statuses"] = [s.strip() for s in statuses.split(",") if s.strip()]
+    if date_from:
+        clauses.append("a.date >= $dateFrom")
+        params["dateFrom"] = date_from
+    if date_to:
+        clauses.append("a.date <= $dateTo")
+        params["dateTo"] = date_to
+    if service:
+        clauses.append("a.service = $service")
+        params["service"] = service
+    return clauses, params
+
+
+def _appointment_page_query(
+    clauses: List[str],
+    params: Dict[str, Any],
+    keys: List[Tuple[str, str, str]],
+    cursor: Optional[str],
+    limit: Optional[int],
+    label: str = "Appointment",
+) -> Tuple[str, Dict[str, Any]]:
+    page_clauses = list(clauses)
+    page_params = dict(params)
+    if cursor:
+        for idx, value in enumerate(_decode_cursor(cursor, len(keys))):
+            page_params[f"c{idx}"] = value
+        page_clauses.append(_keyset_condition(keys))
+
+    where = f"WHERE {' AND '.join(page_clauses)} " if page_clauses else ""
+    returns = ", ".join(f"{ret} AS k{idx}" for idx, (_, ret, _) in enumerate(keys))
+    order = ", ".join(f"{expr} ASC" for expr, _, _ in keys)
+    query = f"MATCH (a:{label}) {where}WITH a ORDER BY {order}"
+    if limit is not None:
+        query += " LIMIT $limit"
+        page_params["limit"] = limit
+    query += f" RETURN a {{.*}} AS a, {returns}"
+    return query, page_params
+
+
+async def _page_appointments(
+    session,
+    clauses: List[str],
+    params: Dict[str, Any],
+    keys: List[Tuple[str, str, str]],
+    cursor: Optional[str],
+    limit: Optional[int],
+    include_total: bool,
+    label: str = "Appointment",
+) -> Dict[str, Any]:
+    query, page_params = _appointment_page_query(clauses, params, keys, cursor, None if limit is None else limit + 1, label)
+    result = await session.run(query, page_params)
+    records = [r async for r in result]
+    next_cursor = None
+    if limit is not None and len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = _encode_cursor([last[f"k{idx}"] for idx in range(len(keys))])
+
+    page: Dict[str, Any] = {
+        "appointments": [_appointment_to_dict(r["a"]) for r in records],
+        "nextCursor": next_cursor,
+    }
+    if include_total:
+        count_where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        count_result = await session.run(f"MATCH (a:{label}) {count_where}RETURN count(a) AS total", params)
+        page["total"] = (await count_result.single())["total"]
+    return page
+
+
+async def _stream_records(
+    driver,
+    query: str,
+    params: Dict[str, Any],
+    field: str,
+    mode: str,
+    convert: Callable[[Any], Dict[str, Any]],
+) -> AsyncIterator[bytes]:
+    async with driver.session() as session:
+        result = await session.run(query, params)
+        if mode == "ndjson":
+            async for r in result:
+                yield _dumps(convert(r["a"])) + b"\n"
+            return
+
+        yield b'{"' + field.encode("utf-8") + b'":['
+        first = True
+        async for r in result:
+            chunk = _dumps(convert(r["a"]))
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]}"
+
+
+def _streaming_response(
+    driver,
+    query: str,
+    params: Dict[str, Any],
+    field: str,
+    mode: str,
+    convert: Callable[[Any], Dict[str, Any]] = _appointment_to_dict,
+) -> StreamingResponse:
+    media_type = "application/x-ndjson" if mode == "ndjson" else "application/json"
+    return StreamingResponse(_stream_records(driver, query, params, field, mode, convert), media_type=media_type)
 
 
 @app.get("/api/queue/all")
-async def queue_all(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
-            "MATCH (a:Appointment) WHERE a.status = 'approved' RETURN a ORDER BY a.date ASC, a.queueNumber ASC"
+async def queue_all(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="dateFrom"),
+    date_to: Optional[str] = Query(None, alias="dateTo"),
+    service: Optional[str] = None,
+    include_total: bool = Query(False, alias="includeTotal"),
+    stream: Optional[str] = Query(None, pattern="^(ndjson|array)$"),
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Any:
+    clauses, params = _appointment_filters("approved", date_from, date_to, service)
+    driver = await _get_driver()
+    if stream:
+        query, page_params = _appointment_page_query(clauses, params, _QUEUE_PAGE_KEYS, cursor, limit)
+        return _streaming_response(driver, query, page_params, "appointments", stream)
+    async with driver.session() as session:
+        return _FastJSONResponse(
+            await _page_appointments(session, clauses, params, _QUEUE_PAGE_KEYS, cursor, limit or MAX_PAGE_SIZE, include_total)
         )
-        appointments = [_node_to_dict(r["a"]) for r in result]
-        return {"appointments": appointments}
 
 
 @app.get("/api/admin/appointments")
-async def admin_get_appointments(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
-            "MATCH (a:Appointment) RETURN a ORDER BY a.date ASC, a.time ASC, a.createdAt ASC"
+async def admin_get_appointments(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    date_from: Optional[str] = Query(None, alias="dateFrom"),
+    date_to: Optional[str] = Query(None, alias="dateTo"),
+    service: Optional[str] = None,
+    include_total: bool = Query(False, alias="includeTotal"),
+    stream: Optional[str] = Query(None, pattern="^(ndjson|array)$"),
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Any:
+    clauses, params = _appointment_filters(status_filter, date_from, date_to, service)
+    driver = await _get_driver()
+    if stream:
+        query, page_params = _appointment_page_query(clauses, params, _APPOINTMENT_PAGE_KEYS, cursor, limit)
+        return _streaming_response(driver, query, page_params, "appointments", stream)
+    async with driver.session() as session:
+        return _FastJSONResponse(
+            await _page_appointments(session, clauses, params, _APPOINTMENT_PAGE_KEYS, cursor, limit or MAX_PAGE_SIZE, include_total)
         )
-        appointments = [_node_to_dict(r["a"]) for r in result]
-        return {"appointments": appointments}
 
 
 @app.post("/api/admin/appointments/{appointment_id}/approve")
@@ -640,25 +2748,32 @@ async def admin_approve_appointment(
     payload: AppointmentDecision,
     _: Dict[str, Any] = Depends(require_admin),
 ) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        record = session.run(
+    async def _approve(tx) -> Optional[Dict[str, Any]]:
+        state = await _lock_appointment_queue(tx, appointment_id)
+        if state is None:
+            return None
+        _ensure_not_served(state)
+        if state["status"] not in _ACTIVE_STATUSES:
+            await _reserve_slot(tx, state["date"], state["time"])
+        if state["status"] != "approved" and state["date"]:
+            await _queue_insert(tx, appointment_id, state["date"])
+
+        result = await tx.run(
             "MATCH (a:Appointment {id: $id}) "
             "SET a.status = 'approved', a.approvedAt = datetime(), a.estimatedTime = $estimatedTime "
             "RETURN a",
             id=appointment_id,
             estimatedTime=payload.estimatedTime,
-        ).single()
-        if record is None:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-
-        appt = _node_to_dict(record["a"])
-        appt_date = appt.get("date")
-        if appt_date:
-            _renumber_approved_queue_for_date(session, appt_date)
+        )
+        return _appointment_to_dict((await result.single())["a"])
 
-        refreshed = session.run("MATCH (a:Appointment {id: $id}) RETURN a", id=appointment_id).single()
-        appointment = _node_to_dict((refreshed or record)["a"])
+    driver = await _get_driver()
+    async with driver.session() as session:
+        appointment = await session.execute_write(_approve)
+        if appointment is None:
+            raise HTTPException(status_code=404, detail="Appointment not found")
+        _queue_changed(appointment_id, (appointment.get("date"),))
+        _availability_changed()
         return {"appointment": appointment}
 
 
@@ -667,102 +2782,715 @@ async def admin_decline_appointment(
     appointment_id: str,
     _: Dict[str, Any] = Depends(require_admin),
 ) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        record = session.run(
+    async def _decline(tx) -> Optional[Dict[str, Any]]:
+        state = await _lock_appointment_queue(tx, appointment_id)
+        if state is None:
+            return None
+        _ensure_not_served(state)
+        if state["status"] == "approved" and state["date"]:
+            await _queue_remove(tx, appointment_id, state["date"], state["queueNumber"])
+        if state["status"] in _ACTIVE_STATUSES:
+            await _release_slot(tx, state["date"], state["time"])
+
+        result = await tx.run(
             "MATCH (a:Appointment {id: $id}) "
             "SET a.status = 'declined', a.declinedAt = datetime() "
             "REMOVE a.queueNumber "
             "RETURN a",
             id=appointment_id,
-        ).single()
-        if record is None:
+        )
+        return _appointment_to_dict((await result.single())["a"])
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        appointment = await session.execute_write(_decline)
+        if appointment is None:
             raise HTTPException(status_code=404, detail="Appointment not found")
-        appointment = _node_to_dict(record["a"])
+        _queue_changed(appointment_id, (appointment.get("date"),))
+        _availability_changed()
         return {"appointment": appointment}
 
 
+@app.post("/api/admin/appointments/{appointment_id}/serve")
+async def admin_serve_appointment(
+    appointment_id: str,
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    async def _serve(tx) -> Optional[Dict[str, Any]]:
+        state = await _lock_appointment_queue(tx, appointment_id)
+        if state is None:
+            return None
+        if state["status"] != "approved":
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Only approved appointments can be served")
+        await _queue_remove(tx, appointment_id, state["date"], state["queueNumber"])
+
+        result = await tx.run(
+            "MATCH (a:Appointment {id: $id}) "
+            "OPTIONAL MATCH (p:Appointment {date: a.date, status: 'served'}) "
+            "RETURN a.service AS service, a.approvedAt AS approvedAt, max(p.servedAt) AS previous",
+            id=appointment_id,
+        )
+        record = await result.single()
+        served_at = datetime.now(timezone.utc)
+        seconds = _handling_seconds(served_at, record["previous"], record["approvedAt"])
+        result = await tx.run(
+            "MATCH (a:Appointment {id: $id}) "
+            "SET a.status = 'served', a.servedAt = $servedAt, a.serviceSeconds = $seconds "
+            "REMOVE a.queueNumber "
+            "RETURN a",
+            id=appointment_id,
+            servedAt=served_at,
+            seconds=seconds,
+        )
+        appointment = _appointment_to_dict((await result.single())["a"])
+        if seconds is not None:
+            await _record_service_time(tx, record["service"], seconds)
+        return appointment
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        appointment = await session.execute_write(_serve)
+        if appointment is None:
+            raise HTTPException(status_code=404, detail="Appointment not found")
+        if appointment.get("serviceSeconds") is not None:
+            _emit("timings")
+        _queue_changed(appointment_id, (appointment.get("date"),))
+        return {"appointment": appointment}
+
+
+def _bulk_ids(ids: List[str]) -> List[str]:
+    unique = list(dict.fromkeys(ids))
+    if len(unique) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} appointments per request")
+    return unique
+
+
+async def _read_bulk_states(tx, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    result = await tx.run(
+        "MATCH (a:Appointment) WHERE a.id IN $ids "
+        "RETURN a.id AS id, a.status AS status, a.date AS date, a.time AS time",
+        ids=ids,
+    )
+    return {r["id"]: dict(r) async for r in result}
+
+
+async def _lock_bulk_queues(tx, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    # Same re-read-until-stable rule as _lock_appointment_queue, with the day locks
+    # taken in date order so two overlapping batches cannot deadlock each other.
+    states = await _read_bulk_states(tx, ids)
+    locked: set = set()
+    while True:
+        pending = sorted({s["date"] for s in states.values() if s["date"]} - locked)
+        if not pending:
+            return states
+        for appt_date in pending:
+            await _lock_queue_date(tx, appt_date)
+            locked.add(appt_date)
+        states = await _read_bulk_states(tx, ids)
+
+
+def _slot_counts(states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    counts: Dict[Tuple[Any, Any], int] = {}
+    for state in states:
+        key = (state["date"], state["time"])
+        counts[key] = counts.get(key, 0) + 1
+    ordered = sorted(counts.items(), key=lambda kv: (kv[0][0] or "", kv[0][1] or ""))
+    return [{"date": d, "time": t, "count": c} for (d, t), c in ordered]
+
+
+async def _reserve_slots(tx, states: List[Dict[str, Any]]) -> None:
+    if not states:
+        return
+    result = await tx.run(
+        "UNWIND $slots AS s "
+        "MATCH (av:Availability {date: s.date, time: s.time}) "
+        "SET av.booked = coalesce(av.booked, 0) + s.count "
+        "RETURN av.date AS date, av.time AS time, av.booked AS booked, av.slots AS slots",
+        slots=_slot_counts(states),
+    )
+    async for r in result:
+        if r["slots"] is not None and r["booked"] > r["slots"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Time slot {r['date']} {r['time']} does not have enough free seats",
+            )
+
+
+async def _release_slots(tx, states: List[Dict[str, Any]]) -> None:
+    if not states:
+        return
+    result = await tx.run(
+        "UNWIND $slots AS s "
+        "MATCH (av:Availability {date: s.date, time: s.time}) "
+        "SET av.booked = CASE WHEN coalesce(av.booked, 0) > s.count THEN av.booked - s.count ELSE 0 END",
+        slots=_slot_counts(states),
+    )
+    await result.consume()
+
+
+@app.post("/api/admin/appointments/bulk-approve")
+async def admin_bulk_approve_appointments(
+    payload: BulkAppointmentDecision,
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    ids = _bulk_ids(payload.ids)
+
+    async def _approve(tx) -> Tuple[List[Dict[str, Any]], List[str]]:
+        states = await _lock_bulk_queues(tx, ids)
+        for state in states.values():
+            _ensure_not_served(state)
+        await _reserve_slots(tx, [s for s in states.values() if s["status"] not in _ACTIVE_STATUSES])
+        result = await tx.run(
+            "MATCH (a:Appointment) WHERE a.id IN $ids "
+            "SET a.status = 'approved', a.approvedAt = datetime(), a.estimatedTime = $estimatedTime",
+            ids=list(states),
+            estimatedTime=payload.estimatedTime,
+        )
+        await result.consume()
+        dates = sorted({s["date"] for s in states.values() if s["status"] != "approved" and s["date"]})
+        for appt_date in dates:
+            await _renumber_approved_queue_for_date(tx, appt_date)
+        result = await tx.run("MATCH (a:Appointment) WHERE a.id IN $ids RETURN a", ids=list(states))
+        return [_appointment_to_dict(r["a"]) async for r in result], dates
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        appointments, dates = await session.execute_write(_approve)
+        found = {a.get("id") for a in appointments}
+        _queue_changed(None, tuple(dates))
+        _availability_changed()
+        return {"appointments": appointments, "notFound": [i for i in ids if i not in found]}
+
+
+@app.post("/api/admin/appointments/bulk-decline")
+async def admin_bulk_decline_appointments(
+    payload: BulkAppointmentDecision,
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    ids = _bulk_ids(payload.ids)
+
+    async def _decline(tx) -> Tuple[List[Dict[str, Any]], List[str]]:
+        states = await _lock_bulk_queues(tx, ids)
+        for state in states.values():
+            _ensure_not_served(state)
+        await _release_slots(tx, [s for s in states.values() if s["status"] in _ACTIVE_STATUSES])
+        result = await tx.run(
+            "MATCH (a:Appointment) WHERE a.id IN $ids "
+            "SET a.status = 'declined', a.declinedAt = datetime() "
+            "REMOVE a.queueNumber "
+            "RETURN a",
+            ids=list(states),
+        )
+        appointments = [_appointment_to_dict(r["a"]) async for r in result]
+        dates = sorted({s["date"] for s in states.values() if s["status"] == "approved" and s["date"]})
+        for appt_date in dates:
+            await _renumber_approved_queue_for_date(tx, appt_date)
+        return appointments, dates
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        appointments, dates = await session.execute_write(_decline)
+        found = {a.get("id") for a in appointments}
+        _queue_changed(None, tuple(dates))
+        _availability_changed()
+        return {"appointments": appointments, "notFound": [i for i in ids if i not in found]}
+
+
+async def _approved_queue_dates(session, appt_date: Optional[str]) -> List[str]:
+    if appt_date:
+        return [appt_date]
+    result = await session.run(
+        "MATCH (a:Appointment) WHERE a.status = 'approved' AND a.date IS NOT NULL "
+        "RETURN DISTINCT a.date AS date ORDER BY date"
+    )
+    return [r["date"] async for r in result]
+
+
+@app.get("/api/admin/queue/verify")
+async def admin_verify_queue(date: Optional[str] = None, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        dates = await _approved_queue_dates(session, date)
+        reports = []
+        for appt_date in dates:
+            reports.append(await session.execute_read(_check_queue_for_date, appt_date))
+        return {"consistent": all(r["consistent"] for r in reports), "dates": reports}
+
+
+@app.post("/api/admin/queue/rebuild")
+async def admin_rebuild_queue(date: Optional[str] = None, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
+    async def _rebuild(tx, appt_date: str) -> Dict[str, Any]:
+        await _renumber_approved_queue_for_date(tx, appt_date)
+        return await _check_queue_for_date(tx, appt_date)
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        dates = await _approved_queue_dates(session, date)
+        reports = []
+        for appt_date in dates:
+            reports.append(await session.execute_write(_rebuild, appt_date))
+        _queue_changed(None, tuple(dates))
+        return {"consistent": all(r["consistent"] for r in reports), "dates": reports}
+
+
+@app.get("/api/admin/queue/eta")
+async def admin_queue_eta(date: str, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
+    etas = await _queue_etas(date)
+    timings = await _timing_cache.get_or_load("services", _load_service_timings)
+    appointments = [{"id": i, **eta} for i, eta in etas.items()]
+    return {"date": date, "appointments": appointments, "services": timings}
+
+
+def _metric_line(name: str, kind: str, help_text: str, value: float) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value:g}"]
+
+
+@app.get("/metrics")
+async def metrics(request: Request) -> PlainTextResponse:
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Metrics token required")
+    lines: List[str] = []
+    for metric in (_http_requests, _http_latency, _http_db_queries, _http_unhandled, _http_rate_limited, _db_latency, _db_rows, _db_errors, _db_slow):
+        lines += metric.render()
+    pool = _password_pool_snapshot()
+    lines += _metric_line("password_pool_in_flight", "gauge", "bcrypt jobs queued or running.", pool["inFlight"])
+    lines += _metric_line("password_pool_rejected_total", "counter", "bcrypt jobs rejected because the pool was saturated.", pool["rejected"])
+    for cache in (_catalog_cache, _availability_cache, _profile_cache, _timing_cache, _eta_cache, _queue_cache, _idempotency_cache):
+        stats = cache.stats()
+        lines += _metric_line(f"cache_{cache.name}_hits_total", "counter", f"{cache.name} cache hits.", stats["hits"])
+        lines += _metric_line(f"cache_{cache.name}_misses_total", "counter", f"{cache.name} cache misses.", stats["misses"])
+    tokens = _token_cache_snapshot()
+    lines += _metric_line("token_cache_hits_total", "counter", "Verified-token cache hits.", tokens["hits"])
+    lines += _metric_line("token_cache_misses_total", "counter", "Verified-token cache misses.", tokens["misses"])
+    lines += _metric_line("queue_ws_subscribers", "gauge", "Open queue WebSocket connections.", _queue_hub.stats()["connections"])
+    events = _event_bus.stats()
+    lines += _metric_line("event_bus_sent_total", "counter", "Cache and queue events sent to other workers.", events["sent"])
+    lines += _metric_line("event_bus_received_total", "counter", "Cache and queue events received from other workers.", events["received"])
+    lines += _metric_line("event_bus_errors_total", "counter", "Event bus send, receive and connection errors.", events["errors"])
+    lines += _metric_line("archived_appointments_total", "counter", "Appointments moved to the archive by this worker.", _archive_stats["archived"])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/admin/stats")
+async def admin_stats(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
+    return {
+        "passwordPool": _password_pool_snapshot(),
+        "caches": {c.name: c.stats() for c in (_catalog_cache, _availability_cache, _profile_cache, _timing_cache, _eta_cache, _queue_cache, _idempotency_cache)},
+        "tokens": _token_cache_snapshot(),
+        "queuePush": _queue_hub.stats(),
+        "rateLimit": _rate_limit_store.stats(),
+        "events": _event_bus.stats(),
+        "archive": dict(_archive_stats),
+    }
+
+
+@app.get("/api/admin/schema")
+async def admin_schema(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        return await _schema_report(session)
+
+
+@app.post("/api/admin/schema")
+async def admin_ensure_schema(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        return await _ensure_schema(session)
+
+
+def _dashboard_window(date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, str]:
+    try:
+        start = date.fromisoformat(date_from) if date_from else _office_now().date()
+        end = date.fromisoformat(date_to) if date_to else start + timedelta(days=DASHBOARD_DAYS - 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="dateTo must not be before dateFrom")
+    if (end - start).days >= DASHBOARD_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"The dashboard window is limited to {DASHBOARD_MAX_DAYS} days")
+    return start.isoformat(), end.isoformat()
+
+
+async def _read_rows(query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run(query, params)
+        return [dict(r) async for r in result]
+
+
+async def _dashboard_page(date_from: str, date_to: str) -> Dict[str, Any]:
+    clauses, params = _appointment_filters(None, date_from, date_to, None)
+    driver = await _get_driver()
+    async with driver.session() as session:
+        return await _page_appointments(session, clauses, params, _APPOINTMENT_PAGE_KEYS, None, MAX_PAGE_SIZE, False)
+
+
+def _dashboard_days(status_counts: List[Dict[str, Any]], slot_totals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    days: Dict[str, Dict[str, Any]] = {}
+
+    def day(appt_date: str) -> Dict[str, Any]:
+        if appt_date not in days:
+            days[appt_date] = {"date": appt_date, "appointments": 0, "byStatus": {}, "queueLength": 0, "slots": 0, "booked": 0, "remaining": 0}
+        return days[appt_date]
+
+    for r in status_counts:
+        entry = day(r["date"])
+        entry["byStatus"][r["status"]] = r["count"]
+        entry["appointments"] += r["count"]
+        if r["status"] == "approved":
+            entry["queueLength"] = r["count"]
+    for r in slot_totals:
+        entry = day(r["date"])
+        entry.update(slots=r["slots"], booked=r["booked"], remaining=r["remaining"])
+    return [days[d] for d in sorted(days)]
+
+
+@app.get("/api/admin/dashboard")
+async def admin_dashboard(
+    date_from: Optional[str] = Query(None, alias="dateFrom"),
+    date_to: Optional[str] = Query(None, alias="dateTo"),
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Any:
+    # Everything the admin page needs in one request: the reads run concurrently on
+    # separate pooled sessions, per-date totals are aggregated in Cypher, and the
+    # catalog and availability come from the same caches as the public endpoints.
+    date_from, date_to = _dashboard_window(date_from, date_to)
+    window = {"dateFrom": date_from, "dateTo": date_to}
+    status_counts, slot_totals, page, services, availabilities = await asyncio.gather(
+        _read_rows(
+            "MATCH (a:Appointment) WHERE a.date >= $dateFrom AND a.date <= $dateTo "
+            "RETURN a.date AS date, a.status AS status, count(*) AS count",
+            window,
+        ),
+        _read_rows(
+            "MATCH (av:Availability) WHERE av.date >= $dateFrom AND av.date <= $dateTo "
+            "WITH av.date AS date, av.slots AS slots, coalesce(av.booked, 0) AS booked "
+            "RETURN date, sum(slots) AS slots, sum(booked) AS booked, "
+            "sum(CASE WHEN slots > booked THEN slots - booked ELSE 0 END) AS remaining",
+            window,
+        ),
+        _dashboard_page(date_from, date_to),
+        _catalog_cache.get_or_load("services", lambda: _tagged("catalog", _load_services)),
+        _availability_cache.get_or_load(
+            (date_from, date_to, False), lambda: _tagged("availability", lambda: _load_availability(date_from, date_to, False))
+        ),
+    )
+    return _FastJSONResponse(
+        {
+            "window": window,
+            "days": _dashboard_days(status_counts, slot_totals),
+            "services": services[0],
+            "availabilities": availabilities[0],
+            "appointments": page["appointments"],
+            "nextCursor": page["nextCursor"],
+        }
+    )
+
+
+_archive_lock = asyncio.Lock()
+_archive_task: Optional["asyncio.Task[None]"] = None
+_archive_stats: Dict[str, Any] = {"runs": 0, "archived": 0, "lastRunAt": None, "lastCutoff": None, "lastArchived": 0, "lastError": None}
+
+
+async def _archive_batch(cutoff: str, limit: int) -> Tuple[int, List[str]]:
+    async def _work(tx):
+        result = await tx.run(
+            "MATCH (a:Appointment) WHERE a.date < $cutoff AND a.status IN $statuses "
+            "WITH a LIMIT $limit "
+            "REMOVE a:Appointment SET a:ArchivedAppointment, a.archivedAt = datetime() "
+            "RETURN count(a) AS archived, collect(DISTINCT a.date) AS dates",
+            cutoff=cutoff,
+            limit=limit,
+            statuses=list(_FINAL_STATUSES),
+        )
+        record = await result.single()
+        return record["archived"], record["dates"]
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        return await session.execute_write(_work)
+
+
+async def _archive_appointments(retention_days: int) -> Dict[str, Any]:
+    # Moves finished appointments on past dates out of the Appointment label in
+    # bounded write transactions, so live listings and per-date queue queries only
+    # index upcoming days. Relabelling keeps the HAS_APPOINTMENT relationship and every
+    # property. Pending and approved ones stay live until an admin resolves them: they
+    # still hold their slot and block the owner's next booking of that service.
+    cutoff = (_office_now().date() - timedelta(days=retention_days)).isoformat()
+    archived, batches, complete = 0, 0, False
+    dates: Set[str] = set()
+    async with _archive_lock:
+        try:
+            while batches < ARCHIVE_MAX_BATCHES:
+                count, batch_dates = await _archive_batch(cutoff, ARCHIVE_BATCH_SIZE)
+                batches += 1
+                archived += count
+                dates.update(batch_dates)
+                if count < ARCHIVE_BATCH_SIZE:
+                    complete = True
+                    break
+            _archive_stats["lastError"] = None
+        except Exception as e:
+            _archive_stats["lastError"] = repr(e)
+            raise
+        finally:
+            _archive_stats["runs"] += 1
+            _archive_stats["archived"] += archived
+            _archive_stats.update(lastRunAt=datetime.now(timezone.utc).isoformat(), lastCutoff=cutoff, lastArchived=archived)
+            if dates:
+                _queue_changed(None, tuple(dates))
+    return {"cutoff": cutoff, "archived": archived, "batches": batches, "complete": complete}
+
+
+async def _archive_loop() -> None:
+    # Jittered so several workers started together do not archive in lockstep;
+    # a run that overlaps another worker's finds nothing left to relabel.
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL * random.uniform(0.5, 1.0))
+        try:
+            report = await _archive_appointments(ARCHIVE_RETENTION_DAYS)
+            if report["archived"]:
+                print(f"Archived {report['archived']} appointments dated before {report['cutoff']}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Archive warning: {e!r}")
+
+
+@app.post("/api/admin/archive/run")
+async def admin_run_archive(
+    retention_days: int = Query(ARCHIVE_RETENTION_DAYS, ge=0, alias="retentionDays"),
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    return await _archive_appointments(retention_days)
+
+
+@app.get("/api/admin/archive/appointments")
+async def admin_get_archived_appointments(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    date_from: Optional[str] = Query(None, alias="dateFrom"),
+    date_to: Optional[str] = Query(None, alias="dateTo"),
+    service: Optional[str] = None,
+    include_total: bool = Query(False, alias="includeTotal"),
+    stream: Optional[str] = Query(None, pattern="^(ndjson|array)$"),
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Any:
+    clauses, params = _appointment_filters(status_filter, date_from, date_to, service)
+    driver = await _get_driver()
+    if stream:
+        query, page_params = _appointment_page_query(clauses, params, _APPOINTMENT_PAGE_KEYS, cursor, limit, "ArchivedAppointment")
+        return _streaming_response(driver, query, page_params, "appointments", stream)
+    async with driver.session() as session:
+        return _FastJSONResponse(
+            await _page_appointments(
+                session, clauses, params, _APPOINTMENT_PAGE_KEYS, cursor, limit or MAX_PAGE_SIZE, include_total, "ArchivedAppointment"
+            )
+        )
+
+
 @app.get("/api/admin/services")
 async def admin_services(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (s:Service) RETURN s ORDER BY s.name")
-        services = [_node_to_dict(r["s"]) for r in result]
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (s:Service) RETURN s {.*} AS s ORDER BY s.name")
+        services = [_service_to_dict(r["s"]) async for r in result]
         return {"services": services}
 
 
 @app.post("/api/admin/services")
 async def admin_create_service(payload: ServiceCreate, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
+    driver = await _get_driver()
+    async with driver.session() as session:
         service_id = payload.id or None
         if service_id is None:
-            service_id = session.run("RETURN randomUUID() as id").single()["id"]
+            id_result = await session.run("RETURN randomUUID() as id")
+            service_id = (await id_result.single())["id"]
 
-        result = session.run(
-            "CREATE (s:Service {id: $id, name: $name, requirements: $requirements}) RETURN s",
-            id=service_id,
-            name=payload.name,
-            requirements=payload.requirements,
-        )
-        service = _node_to_dict(result.single()["s"])
+        try:
+            result = await session.run(
+                "CREATE (s:Service {id: $id, name: $name, requirements: $requirements}) RETURN s",
+                id=service_id,
+                name=payload.name,
+                requirements=payload.requirements,
+            )
+            service = _service_to_dict((await result.single())["s"])
+        except ConstraintError:
+            raise HTTPException(status_code=400, detail="Service already exists")
+        _catalog_changed()
         return {"service": service}
 
 
 @app.put("/api/admin/services/{service_id}")
 async def admin_update_service(service_id: str, payload: ServiceCreate, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run(
             "MATCH (s:Service {id: $id}) SET s.name = $name, s.requirements = $requirements RETURN s",
             id=service_id,
             name=payload.name,
             requirements=payload.requirements,
         )
-        record = result.single()
+        record = await result.single()
         if record is None:
             raise HTTPException(status_code=404, detail="Service not found")
-        service = _node_to_dict(record["s"])
+        service = _service_to_dict(record["s"])
+        _catalog_changed()
         return {"service": service}
 
 
 @app.delete("/api/admin/services/{service_id}")
 async def admin_delete_service(service_id: str, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        session.run("MATCH (s:Service {id: $id}) DETACH DELETE s", id=service_id)
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (s:Service {id: $id}) DETACH DELETE s", id=service_id)
+        await result.consume()
+        _catalog_changed()
         return {"message": "Service deleted successfully"}
 
 
+_ALL_AVAILABILITY = "MATCH (a:Availability) RETURN a {.*} AS a ORDER BY a.date, a.time"
+
+
 @app.get("/api/admin/availability")
-async def admin_get_availability(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run("MATCH (a:Availability) RETURN a ORDER BY a.date, a.time")
-        availabilities = [_node_to_dict(r["a"]) for r in result]
-        return {"availabilities": availabilities}
+async def admin_get_availability(
+    stream: Optional[str] = Query(None, pattern="^(ndjson|array)$"),
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Any:
+    driver = await _get_driver()
+    if stream:
+        return _streaming_response(driver, _ALL_AVAILABILITY, {}, "availabilities", stream, _availability_to_dict)
+    async with driver.session() as session:
+        result = await session.run(_ALL_AVAILABILITY)
+        availabilities = [_availability_to_dict(r["a"]) async for r in result]
+        return _FastJSONResponse({"availabilities": availabilities})
+
+
+_AVAILABILITY_MERGE = (
+    "MERGE (a:Availability {date: s.date, time: s.time}) "
+    "ON CREATE SET a.slots = $slots, a.id = randomUUID() "
+    "ON MATCH SET a.slots = $slots "
+    "WITH a "
+    "OPTIONAL MATCH (x:Appointment) "
+    "WHERE a.booked IS NULL AND x.date = a.date AND x.time = a.time AND x.status IN $statuses "
+    "WITH a, count(x) AS existing "
+    "SET a.booked = coalesce(a.booked, existing) "
+    "RETURN a"
+)
 
 
 @app.post("/api/admin/availability")
 async def admin_create_availability(payload: AvailabilityCreate, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        result = session.run(
-            "MERGE (a:Availability {date: $date, time: $time}) "
-            "ON CREATE SET a.slots = $slots, a.id = randomUUID() "
-            "ON MATCH SET a.slots = $slots "
-            "RETURN a",
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run(
+            "WITH {date: $date, time: $time} AS s " + _AVAILABILITY_MERGE,
             date=payload.date,
             time=payload.time,
             slots=payload.slots,
+            statuses=list(_SEATED_STATUSES),
         )
-        availability = _node_to_dict(result.single()["a"])
+        availability = _availability_to_dict((await result.single())["a"])
+        _availability_changed()
         return {"availability": availability}
 
 
+def _slot_template(payload: BulkAvailabilityCreate) -> List[Dict[str, str]]:
+    try:
+        start = date.fromisoformat(payload.dateFrom)
+        end = date.fromisoformat(payload.dateTo)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="dateFrom and dateTo must be YYYY-MM-DD dates")
+    if end < start:
+        raise HTTPException(status_code=400, detail="dateTo must not be before dateFrom")
+    weekdays = set(payload.weekdays) if payload.weekdays is not None else None
+    times = list(dict.fromkeys(payload.times))
+    # Count the matching days arithmetically so a huge range is rejected before any
+    # per-day list is built.
+    full_weeks, rest = divmod((end - start).days + 1, 7)
+    if weekdays is None:
+        day_count = full_weeks * 7 + rest
+    else:
+        matching = weekdays & set(range(7))
+        day_count = full_weeks * len(matching) + sum((start.weekday() + i) % 7 in matching for i in range(rest))
+    if day_count * len(times) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} time slots per request")
+    days = [
+        date.fromordinal(ordinal)
+        for ordinal in range(start.toordinal(), end.toordinal() + 1)
+        if weekdays is None or date.fromordinal(ordinal).weekday() in weekdays
+    ]
+    return [{"date": d.isoformat(), "time": t} for d in days for t in times]
+
+
+@app.post("/api/admin/availability/bulk")
+async def admin_bulk_create_availability(
+    payload: BulkAvailabilityCreate,
+    _: Dict[str, Any] = Depends(require_admin),
+) -> Dict[str, Any]:
+    slots = _slot_template(payload)
+
+    async def _create(tx) -> List[Dict[str, Any]]:
+        result = await tx.run(
+            "UNWIND $template AS s " + _AVAILABILITY_MERGE,
+            template=slots,
+            slots=payload.slots,
+            statuses=list(_SEATED_STATUSES),
+        )
+        return [_availability_to_dict(r["a"]) async for r in result]
+
+    driver = await _get_driver()
+    async with driver.session() as session:
+        availabilities = await session.execute_write(_create) if slots else []
+        _availability_changed()
+        return {"availabilities": availabilities}
+
+
+@app.post("/api/admin/availability/recount")
+async def admin_recount_availability(_: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
+    driver = await _get_driver()
+    async with driver.session() as session:
+        slots = await _recount_slot_bookings(session)
+        _availability_changed()
+        return {"slots": slots}
+
+
 @app.delete("/api/admin/availability/{availability_id}")
 async def admin_delete_availability(availability_id: str, _: Dict[str, Any] = Depends(require_admin)) -> Dict[str, Any]:
-    driver = _get_driver()
-    with driver.session() as session:
-        session.run("MATCH (a:Availability {id: $id}) DETACH DELETE a", id=availability_id)
+    driver = await _get_driver()
+    async with driver.session() as session:
+        result = await session.run("MATCH (a:Availability {id: $id}) DETACH DELETE a", id=availability_id)
+        await result.consume()
+        _availability_changed()
         return {"message": "Availability deleted successfully"}
+
+
+async def _run_bootstrap_command(reset_admin_password: bool) -> Dict[str, Any]:
+    try:
+        driver = await _get_driver()
+        async with driver.session() as session:
+            return await _bootstrap(session, reset_admin_password)
+    finally:
+        if _password_executor is not None:
+            _password_executor.shutdown(wait=False)
+        if _driver is not None:
+            await _driver.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Registrar booking backend maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bootstrap_parser = commands.add_parser(
+        "bootstrap", help="create schema, default services and the admin account (safe to re-run)"
+    )
+    bootstrap_parser.add_argument(
+        "--reset-admin-password", action="store_true", help="reset the admin password to the configured default"
+    )
+    args = parser.parse_args()
+
+    if args.command == "bootstrap":
+        print(json.dumps(asyncio.run(_run_bootstrap_command(args.reset_admin_password)), indent=2))